@@ -1,48 +1,565 @@
-import tkinter as tk
-from tkinter import messagebox
+from bisect import bisect_left
+from collections import deque, namedtuple
+from fractions import Fraction
+import argparse
+import asyncio
+import json
+import operator
+import os
 import random
+import re
+import secrets
+import sys
+import threading
+import time
+from background_tasks import BackgroundTasks
+from instrumentation import metrics, timed
+from launcher import launch, lazy_import
 
-# This function allows the user to select the difficulty of the math quiz.
+# Only imported once a window is opened, so the server and load test run without tkinter
+tk = lazy_import('tkinter')
+messagebox = lazy_import('tkinter.messagebox')
+
+# Range of random operands for each difficulty level
+LEVEL_RANGES = {
+    'easy': (1, 9),  # Single-digit numbers for easy
+    'medium': (10, 99),  # Two-digit numbers for medium
+    'hard': (1000, 9999),  # Four-digit numbers for hard
+}
+
+
+# Function to divide exactly, giving an int when the result is whole and a Fraction otherwise
+def divide(num1, num2):
+    quotient, remainder = divmod(num1, num2)
+    return Fraction(num1, num2) if remainder else quotient
+
+
+# Symbol and function for each possible operation
+OPERATIONS = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': divide}
+
+
+# A generated question, with the answer worked out directly from the operands
+class Question(namedtuple('Question', 'level num1 operation num2 answer')):
+    __slots__ = ()
+
+    # The question as shown to the user, e.g. "12 + 7"
+    @property
+    def text(self):
+        return f"{self.num1} {self.operation} {self.num2}"
+
+
+# Generates questions from its own random stream, so a seed reproduces the same questions
+class QuestionEngine:
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)  # Independent of the global random module
+
+    # Generate a single question for a level
+    def generate(self, level):
+        return self.generate_batch(level, 1)[0]
+
+    # Generate many questions for a level at once, drawing each column of random values in one call
+    def generate_batch(self, level, count):
+        low, high = LEVEL_RANGES[level]
+        operands = range(low, high + 1)
+        first = self.rng.choices(operands, k=count)
+        second = self.rng.choices(operands, k=count)
+        operations = self.rng.choices(list(OPERATIONS), k=count)
+        questions = []
+        for num1, operation, num2 in zip(first, operations, second):
+            # For division, make num1 a multiple of num2 so the answer is a whole number
+            if operation == '/':
+                num1 = num1 * num2
+            questions.append(Question(level, num1, operation, num2, OPERATIONS[operation](num1, num2)))
+        return questions
+
+
+# Engine used by generate_question
+default_engine = QuestionEngine()
+
+
+# This function generates a random question for the selected difficulty level
+@timed('quiz_generate_question_seconds')
 def generate_question(level):
-    # Depending on the selected difficulty level, generate random numbers within different ranges
-    if level == 'easy':
-        num1 = random.randint(1, 9)  # Single-digit numbers for easy
-        num2 = random.randint(1, 9)
-    elif level == 'medium':
-        num1 = random.randint(10, 99)  # Two-digit numbers for medium
-        num2 = random.randint(10, 99)
-    elif level == 'hard':
-        num1 = random.randint(1000, 9999)  # Four-digit numbers for hard
-        num2 = random.randint(1000, 9999)
-
-    # List of possible operations
-    operations = ['+', '-', '*', '/']
-    # Randomly choose one operation
-    operation = random.choice(operations)
-
-    # If the operation is division, ensure num1 is a multiple of num2 to avoid non-integer results
-    if operation == '/':
-        num1 = num1 * num2
-
-    # Create a string representation of the question and calculate the answer using eval()
-    question = f"{num1} {operation} {num2}"
-    return question, eval(question)
+    question = default_engine.generate(level)
+    return question.text, question.answer
+
+
+# Per-level queues of ready-made questions, topped up in the background
+class QuestionPool:
+    MAX_ATTEMPTS = 1000  # Questions to try before giving up on finding one not asked yet
+
+    def __init__(self, seed=None, high_water=200, low_water=50, batch_size=50, tasks=None):
+        self.high_water = high_water  # Each queue is filled up to this many questions
+        self.low_water = low_water  # A refill starts once a queue drops below this
+        self.batch_size = batch_size  # Questions generated at a time, fixed so timing never changes the stream
+        self.tasks = tasks  # BackgroundTasks to refill on, or None to refill when a queue runs dry
+        self.rng = random.Random(seed)  # Used to shuffle questions loaded from a bank
+        # One engine per level, each with its own stream, so seeded pools always hand out the same questions
+        self.engines = {level: QuestionEngine(None if seed is None else f"{seed}-{level}") for level in LEVEL_RANGES}
+        self.queues = {level: deque() for level in LEVEL_RANGES}
+        self.lock = threading.Lock()  # Keeps generating and queueing in step between threads
+        self.refilling = set()  # Levels with a background refill under way
+
+    # Take the next question for a level that is not among the question texts in seen
+    def take(self, level, seen=()):
+        question = None
+        for attempt in range(self.MAX_ATTEMPTS):
+            with self.lock:
+                if not self.queues[level]:
+                    self.fill(level)  # Nothing prefetched, generate right away
+                question = self.queues[level].popleft()
+            if question.text not in seen:
+                break  # Otherwise skip repeats within the session
+        if len(self.queues[level]) < self.low_water:
+            self.refill_in_background(level)
+        return question
+
+    # Top a level's queue up to the high-water mark, the caller must hold the lock
+    def fill(self, level):
+        queue = self.queues[level]
+        while len(queue) < self.high_water:
+            queue.extend(self.engines[level].generate_batch(level, self.batch_size))
+
+    # Start a refill for a level on the worker pool
+    def refill_in_background(self, level):
+        if self.tasks is None or level in self.refilling:
+            return
+        self.refilling.add(level)
+        self.tasks.submit(self.refill, level)
+
+    # Runs on a worker thread
+    def refill(self, task, level):
+        with self.lock:
+            self.fill(level)
+        self.refilling.discard(level)
+
+    # Fill every level in the background, e.g. while the user is still choosing one
+    def prefetch(self):
+        for level in LEVEL_RANGES:
+            self.refill_in_background(level)
+
+    # Write the queued questions to a bank file that other sessions can start from
+    def save_bank(self, filename):
+        with self.lock, open(filename, 'w') as file:
+            for level, queue in self.queues.items():
+                for question in queue:
+                    file.write(f"{level},{question.num1},{question.operation},{question.num2}\n")
+
+    # Queue the questions from a bank file, shuffled with this pool's random stream, returning how many there were
+    def load_bank(self, filename):
+        loaded = {level: [] for level in LEVEL_RANGES}
+        with open(filename) as file:
+            for line in file:
+                try:
+                    level, num1, operation, num2 = line.strip().split(',')
+                    num1, num2 = int(num1), int(num2)
+                    loaded[level].append(Question(level, num1, operation, num2, OPERATIONS[operation](num1, num2)))
+                except (ValueError, KeyError, ZeroDivisionError):
+                    continue  # Skip a damaged line rather than the whole bank
+        with self.lock:
+            for level, questions in loaded.items():
+                self.rng.shuffle(questions)
+                self.queues[level].extend(questions)
+        return sum(map(len, loaded.values()))
+
+
+# What a typed answer may look like: a plain integer or decimal, short enough to parse in no time.
+# Fraction() on its own would also take "1/0" (ZeroDivisionError) and exponents such as "1e20000000",
+# which can take tens of seconds to expand.
+ANSWER_PATTERN = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)")
+MAX_ANSWER_LENGTH = 32
+
+
+# Function to read a typed answer as an exact number, raising ValueError if it is not one
+def parse_answer(text):
+    text = str(text).strip()
+    if len(text) > MAX_ANSWER_LENGTH or not ANSWER_PATTERN.fullmatch(text):
+        raise ValueError(f"{text[:MAX_ANSWER_LENGTH]!r} is not a number")
+    return Fraction(text)
+
+
+# Upper bounds in milliseconds of the answer latency histogram buckets, about 19% apart from 1 ms to 17 minutes
+LATENCY_BUCKETS = tuple(2 ** (i / 4) for i in range(81))
+
+
+# Running totals for one group of answers, updated as each answer comes in
+class ResultAggregate:
+    __slots__ = ('answered', 'correct', 'latency_total', 'latency_counts')
+
+    def __init__(self):
+        self.answered = 0  # Number of answers
+        self.correct = 0  # Number of correct answers
+        self.latency_total = 0.0  # Sum of the latencies in ms, for the mean
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS) + 1)  # Answers per latency bucket, plus one for anything slower
+
+    # Count one answer
+    def add(self, correct, latency_ms):
+        self.answered += 1
+        self.correct += correct
+        self.latency_total += latency_ms
+        self.latency_counts[bisect_left(LATENCY_BUCKETS, latency_ms)] += 1
+
+    # Fraction of answers that were correct
+    @property
+    def accuracy(self):
+        return self.correct / self.answered if self.answered else 0.0
+
+    # Mean latency in ms
+    @property
+    def mean_latency(self):
+        return self.latency_total / self.answered if self.answered else 0.0
+
+    # Latency in ms below which the given percentage of answers fall, to the resolution of the buckets
+    def latency_percentile(self, percentile):
+        if not self.answered:
+            return 0.0
+        rank = percentile * self.answered / 100
+        seen = 0
+        for bucket, count in enumerate(self.latency_counts):
+            seen += count
+            if seen >= rank and count:
+                return LATENCY_BUCKETS[min(bucket, len(LATENCY_BUCKETS) - 1)]
+        return LATENCY_BUCKETS[-1]
+
+    # Fold in the answers counted by another aggregate
+    def merge(self, other):
+        self.answered += other.answered
+        self.correct += other.correct
+        self.latency_total += other.latency_total
+        for bucket, count in enumerate(other.latency_counts):
+            self.latency_counts[bucket] += count
+
+    # Figures for a dashboard
+    def summary(self):
+        return {'answered': self.answered, 'accuracy': self.accuracy, 'mean_latency_ms': self.mean_latency,
+                'p50_latency_ms': self.latency_percentile(50), 'p90_latency_ms': self.latency_percentile(90),
+                'p99_latency_ms': self.latency_percentile(99)}
+
+
+# Append-only record of every answer, with per-level and per-operation aggregates kept up to date as it grows
+class QuizResults:
+    # With replay false the answers already in the file are left out of the aggregates, for the caller to
+    # read the first history_size bytes of it later, e.g. on a worker thread, and merge them in
+    def __init__(self, filename=None, replay=True):
+        self.filename = filename  # Where answers are appended, None keeps them in memory only
+        self.by_level = {level: ResultAggregate() for level in LEVEL_RANGES}
+        self.by_operation = {operation: ResultAggregate() for operation in OPERATIONS}
+        self.file = None
+        self.history_size = 0  # Bytes of answers already in the file when it was opened
+        if filename:
+            if os.path.exists(filename):
+                self.history_size = os.path.getsize(filename)
+                if replay:
+                    self.replay(filename)  # Rebuild the aggregates from the history once, at startup
+            self.file = open(filename, 'a', buffering=1)  # Line buffered, each answer is written as it comes in
+
+    # Record one answer
+    def record(self, question, correct, latency_ms):
+        if self.file is not None:
+            self.file.write(f"{time.time():.3f},{question.level},{question.operation},{question.num1},"
+                            f"{question.num2},{int(correct)},{latency_ms:.3f}\n")
+        self.update(question.level, question.operation, correct, latency_ms)
+
+    # Add one answer to the aggregates
+    def update(self, level, operation, correct, latency_ms):
+        self.by_level[level].add(correct, latency_ms)
+        self.by_operation[operation].add(correct, latency_ms)
+
+    # Feed the answers already in a results file, or in its first size bytes, into the aggregates
+    def replay(self, filename, size=None):
+        read = 0
+        with open(filename, 'rb') as file:
+            for line in file:
+                read += len(line)
+                if size is not None and read > size:
+                    break  # Written after the history was measured, and already counted
+                try:
+                    timestamp, level, operation, num1, num2, correct, latency_ms = line.decode().rstrip('\n').split(',')
+                    self.update(level, operation, correct == '1', float(latency_ms))
+                except (ValueError, KeyError):
+                    continue  # Skip a line cut short by a crash
+
+    # Fold in the aggregates of another QuizResults
+    def merge(self, other):
+        for level, aggregate in other.by_level.items():
+            self.by_level[level].merge(aggregate)
+        for operation, aggregate in other.by_operation.items():
+            self.by_operation[operation].merge(aggregate)
+
+    # Accuracy and latency for every level and operation
+    def summary(self):
+        return {'levels': {level: aggregate.summary() for level, aggregate in self.by_level.items()},
+                'operations': {operation: aggregate.summary() for operation, aggregate in self.by_operation.items()}}
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+# The state of one person's quiz, kept separate from any GUI or network code
+class QuizSession:
+    __slots__ = ('level', 'num_questions', 'score', 'current_question', 'question', 'asked', 'asked_at', 'last_active')
+
+    def __init__(self, level, num_questions=10):
+        self.level = level  # The selected difficulty level
+        self.num_questions = num_questions  # Total number of questions in the quiz
+        self.score = 0  # The current score
+        self.current_question = 0  # Current question number
+        self.question = None  # The question waiting for an answer
+        self.asked = set()  # Questions already asked, so none comes up twice
+        self.asked_at = 0.0  # When the current question was asked, for timing the answer
+        self.last_active = time.monotonic()  # When the session was last used, for evicting idle ones
+
+    # Whether every question has been asked and answered
+    @property
+    def finished(self):
+        return self.question is None and self.current_question >= self.num_questions
+
+    # Take the next question from a pool, or return None once the quiz is over
+    def next_question(self, pool):
+        self.last_active = time.monotonic()
+        if self.current_question >= self.num_questions:
+            self.question = None
+            return None
+        self.current_question += 1
+        self.question = pool.take(self.level, self.asked)
+        self.asked.add(self.question.text)
+        self.asked_at = time.perf_counter()
+        return self.question
+
+    # Mark an answer to the current question, returning whether it was right and the correct answer,
+    # and record it in a QuizResults if one is given
+    def answer(self, user_answer, results=None):
+        latency_ms = (time.perf_counter() - self.asked_at) * 1000
+        self.last_active = time.monotonic()
+        if self.question is None:
+            raise ValueError("there is no question waiting for an answer")
+        correct_answer = self.question.answer
+        correct = parse_answer(user_answer) == correct_answer  # Exact comparison, no float rounding
+        if correct:
+            self.score += 1
+        if results is not None:
+            results.record(self.question, correct, latency_ms)
+        self.question = None
+        return correct, correct_answer
+
+
+# Asyncio server running many quiz sessions at once over newline-delimited JSON on a local socket
+class QuizServer:
+    def __init__(self, pool=None, idle_timeout=600, num_questions=10, results=None):
+        self.pool = pool or QuestionPool()  # Shared by every session
+        self.results = results or QuizResults()  # Answers from every session
+        self.idle_timeout = idle_timeout  # Seconds a session may sit unused before it is evicted
+        self.num_questions = num_questions
+        self.sessions = {}  # Session id -> QuizSession
+        self.server = None
+        self.evictor = None
+
+    # Start listening, port 0 picks a free port which is then available as self.port
+    async def start(self, host='127.0.0.1', port=0):
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.evictor = asyncio.get_running_loop().create_task(self.evict_idle_sessions())
+
+    # Stop listening and drop every session
+    async def stop(self):
+        self.evictor.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+        self.sessions.clear()
+
+    # Serve one client connection, answering each request line with one response line
+    async def handle_connection(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    response = self.handle_request(json.loads(line))
+                except (ValueError, TypeError) as e:
+                    response = {'error': str(e)}
+                except KeyError as e:
+                    response = {'error': f"missing field {e}"}
+                except Exception as e:
+                    # A bug in one request must not drop the connection, the client still gets an answer
+                    metrics.count('quiz_server_errors_total')
+                    response = {'error': f"internal error: {type(e).__name__}"}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ValueError:
+            # readline gives up on a line longer than the stream's limit, tell the client before hanging up
+            writer.write(json.dumps({'error': "request too long"}).encode() + b"\n")
+        except ConnectionError:
+            pass  # The client went away
+        finally:
+            writer.close()
+
+    # Carry out a single request: {"op": "start", "level": ...}, {"op": "answer", "session": ..., "answer": ...}
+    # {"op": "stats"} or {"op": "metrics"}
+    def handle_request(self, request):
+        if request['op'] == 'start':
+            if request['level'] not in LEVEL_RANGES:
+                raise ValueError(f"unknown level {request['level']!r}")
+            session_id = secrets.token_hex(8)
+            session = self.sessions[session_id] = QuizSession(request['level'], self.num_questions)
+            question = session.next_question(self.pool)
+            return {'session': session_id, 'number': session.current_question, 'question': question.text}
+        if request['op'] == 'answer':
+            session = self.sessions.get(request['session'])
+            if session is None:
+                raise ValueError("unknown or expired session")
+            correct, correct_answer = session.answer(request['answer'], self.results)
+            question = session.next_question(self.pool)
+            response = {'correct': correct, 'answer': str(correct_answer), 'score': session.score,
+                        'number': session.current_question, 'question': question and question.text}
+            if question is None:
+                del self.sessions[request['session']]  # The quiz is over
+            return response
+        if request['op'] == 'stats':
+            return self.results.summary()  # Read straight from the running aggregates
+        if request['op'] == 'metrics':
+            return metrics.snapshot()  # Timings and counters, empty unless APP_METRICS is set
+        raise ValueError(f"unknown op {request['op']!r}")
+
+    # Periodically drop sessions that have been idle for too long
+    async def evict_idle_sessions(self):
+        while True:
+            await asyncio.sleep(self.idle_timeout / 2)
+            cutoff = time.monotonic() - self.idle_timeout
+            for session_id in [session_id for session_id, session in self.sessions.items() if session.last_active < cutoff]:
+                del self.sessions[session_id]
+
+
+# Minimal client for QuizServer, used by the load test
+class QuizClient:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host, port):
+        return cls(*await asyncio.open_connection(host, port))
+
+    # Send one request and wait for its response
+    async def request(self, **request):
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+# Load test: hold the given number of sessions open at once and time every answer, returning (p50, p99) in ms
+async def run_load_test(sessions, connections=100, level='easy'):
+    server = QuizServer()
+    await server.start()
+    clients = [await QuizClient.connect('127.0.0.1', server.port) for _ in range(min(connections, sessions))]
+    latencies = []
+
+    # Each connection drives its share of the sessions, answering in turn so they are all open at once
+    async def drive(client, count):
+        session_ids = [(await client.request(op='start', level=level))['session'] for _ in range(count)]
+        for _ in range(server.num_questions):
+            for session_id in session_ids:
+                started = time.perf_counter()
+                await client.request(op='answer', session=session_id, answer='0')
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    shares = [sessions // len(clients) + (i < sessions % len(clients)) for i in range(len(clients))]
+    await asyncio.gather(*(drive(client, count) for client, count in zip(clients, shares)))
+    for client in clients:
+        await client.close()
+    await server.stop()
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[min(len(latencies) * 99 // 100, len(latencies) - 1)]
+
+
+# Function to generate a bank file with the given number of questions for every level
+def save_question_bank(filename, questions_per_level, seed=None):
+    pool = QuestionPool(seed=seed, high_water=questions_per_level)
+    with pool.lock:
+        for level in LEVEL_RANGES:
+            pool.fill(level)
+    pool.save_bank(filename)
+
+
+# Command line entry point: the quiz window by default, or the quiz server, its load test or a question bank
+def main(argv):
+    parser = argparse.ArgumentParser(description="Run the math quiz in a window or as a server, or load test it.")
+    parser.add_argument('--serve', action='store_true', help="serve quiz sessions on a local socket")
+    parser.add_argument('--port', type=int, default=8765, help="port to serve on (default: %(default)s)")
+    parser.add_argument('--load-test', type=int, nargs='+', metavar='SESSIONS',
+                        help="report p50/p99 answer latency with this many concurrent sessions")
+    parser.add_argument('--bank', metavar='FILE', help="start from the questions in a bank file")
+    parser.add_argument('--save-bank', metavar='FILE', help="write a bank of ready-made questions and exit")
+    parser.add_argument('--bank-size', type=int, default=1000,
+                        help="questions per level written by --save-bank (default: %(default)s)")
+    parser.add_argument('--results', metavar='FILE', default='quizResults.txt',
+                        help="file every answer is appended to, and stats are rebuilt from (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.save_bank:
+        save_question_bank(args.save_bank, args.bank_size)
+        print(f"Wrote {args.bank_size} questions per level to {args.save_bank}")
+    elif args.load_test:
+        for sessions in args.load_test:
+            p50, p99 = asyncio.run(run_load_test(sessions))
+            print(f"{sessions} sessions: p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+    elif args.serve:
+        async def serve():
+            pool = QuestionPool()
+            if args.bank:
+                print(f"Loaded {pool.load_bank(args.bank)} questions from {args.bank}")
+            server = QuizServer(pool, results=QuizResults(args.results))
+            await server.start(port=args.port)
+            print(f"Serving quiz sessions on 127.0.0.1:{server.port}")
+            await server.server.serve_forever()
+        asyncio.run(serve())
+    else:
+        launch(MathQuizApp, bank_filename=args.bank, results_filename=args.results)  # Show the window, then load the question bank and results
+    return 0
+
 
 # The MathQuizApp class handles the quiz logic and GUI
 class MathQuizApp:
-    def __init__(self, root):
+    def __init__(self, root, bank_filename=None, results_filename='quizResults.txt'):
         self.root = root  # The root window of the app
         self.root.title("Math Quiz")  # Set the window title
 
         self.level = tk.StringVar()  # Holds the selected difficulty level
-        self.score = 0  # The current score
         self.num_questions = 10  # Total number of questions in the quiz
-        self.current_question = 0  # Current question number
-        self.correct_answer = None  # The correct answer for the current question
+        self.session = None  # Score and questions of the quiz in progress
+
+        # Questions are generated ahead of time on a worker pool, starting from a saved bank if there is one
+        self.tasks = BackgroundTasks(self.root)
+        self.pool = QuestionPool(tasks=self.tasks)
+        self.bank_filename = bank_filename
+
+        # Every answer is kept, along with running accuracy and timing figures, once start has opened the results file
+        self.results_filename = results_filename
+        self.results = None
 
         # Initialize the GUI elements
         self.create_widgets()
 
+    # Read the saved questions and results and start generating questions, called once the window is showing
+    def start(self):
+        if self.bank_filename:
+            self.pool.load_bank(self.bank_filename)
+        self.pool.prefetch()
+        # New answers are recorded straight away, the history is read on the worker pool and merged in after,
+        # so startup does not grow with the number of answers ever given
+        self.results = QuizResults(self.results_filename, replay=False)
+        if self.results.history_size:
+            self.tasks.submit(self.read_history, self.results_filename, self.results.history_size,
+                              on_done=self.results.merge)
+
+    # Runs on a worker thread
+    def read_history(self, task, filename, size):
+        history = QuizResults()
+        history.replay(filename, size)
+        return history
+
     def create_widgets(self):
         # Welcome label at the top of the window
         self.welcome_label = tk.Label(self.root, text="Welcome to the Math Quiz!", font=("Arial", 16))
@@ -85,16 +602,14 @@ class MathQuizApp:
     # Start the quiz with the selected difficulty level
     def start_quiz(self, selected_level):
         self.level.set(selected_level)  # Store the selected difficulty level
-        self.score = 0  # Reset score to 0
-        self.current_question = 0  # Reset current question number to 0
+        self.session = QuizSession(selected_level, self.num_questions)  # Fresh score and questions
         self.ask_question()  # Ask the first question
 
     # Ask a new question
     def ask_question(self):
-        if self.current_question < self.num_questions:  # Check if there are questions left
-            self.current_question += 1  # Increment the current question number
-            question, self.correct_answer = generate_question(self.level.get())  # Generate a new question
-            self.question_label.config(text=f"Question {self.current_question}: {question}")  # Update question label
+        question = self.session.next_question(self.pool)  # Take a ready-made question, if there are any left
+        if question is not None:
+            self.question_label.config(text=f"Question {self.session.current_question}: {question.text}")  # Update question label
             self.feedback_label.config(text="")  # Clear previous feedback
             self.answer_entry.delete(0, tk.END)  # Clear the answer entry for the new question
         else:
@@ -102,15 +617,17 @@ class MathQuizApp:
 
     # Check if the user's answer is correct
     def check_answer(self):
+        if self.session is None:
+            return  # No quiz has been started yet
         user_answer = self.answer_entry.get()  # Get the user's answer from the entry box
         try:
             # Compare user's answer with the correct answer
-            if float(user_answer) == self.correct_answer:
+            correct, correct_answer = self.session.answer(user_answer, self.results)
+            if correct:
                 self.feedback_label.config(text="Correct!", fg="green")  # Correct answer
-                self.score += 1  # Increase the score
             else:
-                self.feedback_label.config(text=f"Incorrect! The correct answer was {self.correct_answer}.", fg="red")  # Incorrect answer
-            self.score_label.config(text=f"Score: {self.score}/{self.current_question}")  # Update the score display
+                self.feedback_label.config(text=f"Incorrect! The correct answer was {correct_answer}.", fg="red")  # Incorrect answer
+            self.score_label.config(text=f"Score: {self.session.score}/{self.session.current_question}")  # Update the score display
             self.ask_question()  # Ask the next question
         except ValueError:
             messagebox.showerror("Invalid input", "Please enter a valid number.")  # Handle invalid input
@@ -120,10 +637,8 @@ class MathQuizApp:
         self.question_label.config(text="Quiz Over!")  # Update the question label to indicate the end
         self.answer_entry.config(state='disabled')  # Disable the answer entry box
         self.submit_button.config(state='disabled')  # Disable the submit button
-        self.feedback_label.config(text=f"Your final score is {self.score}/{self.num_questions}.")  # Show final score
+        self.feedback_label.config(text=f"Your final score is {self.session.score}/{self.num_questions}.")  # Show final score
 
 # Entry point for running the application
 if __name__ == "__main__":
-    root = tk.Tk()  # Create the main application window
-    app = MathQuizApp(root)  # Initialize the MathQuizApp with the root window
-    root.mainloop()  # Start the Tkinter event loop
+    sys.exit(main(sys.argv[1:]))  # Only opening the window imports tkinter
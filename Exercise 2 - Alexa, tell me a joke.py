@@ -1,7 +1,35 @@
-import tkinter as tk
 import random
+import mmap
+from array import array
+from bisect import bisect_left
+import heapq
+import math
+import os
+import re
+import struct
+from background_tasks import BackgroundTasks
+from instrumentation import count, timed
+from launcher import launch, lazy_import
+
+# Only imported once a window is opened, so the corpus and search index can be used without tkinter
+tk = lazy_import('tkinter')
+
+# Start of every joke index file, followed by the size and modification time of the corpus it was built from
+INDEX_MAGIC = b'JOKEIDX1'
+INDEX_HEADER = struct.Struct('<8sQQ')
+# Start of every search index file: magic, corpus size and modification time, number of jokes and of terms
+SEARCH_MAGIC = b'JOKEFTS1'
+SEARCH_HEADER = struct.Struct('<8sQQQQ')
+# One entry per term in the search index: where its text starts, its length, where its postings start, how many
+TERM_ENTRY = struct.Struct('<QIQI')
+# Words too common to say anything about what a joke is about
+STOPWORDS = frozenset(
+    "a an and are as at be but by did do does for from had has have he her him his how i if in is it its me my "
+    "no not of on or our she so than that the their them then there they this to too was we were what when where "
+    "which who why will with would you your".split())
 
 # Function to load jokes from a file
+@timed('jokes_load_seconds')
 def load_jokes(filename):
     jokes = []
     with open(filename, 'r') as file:
@@ -14,9 +42,284 @@ def load_jokes(filename):
                 jokes.append({"setup": setup, "punchline": punchline})
     return jokes
 
+# Function to build an index of where each joke starts in a corpus, reading it one line at a time
+def build_joke_index(filename, index_filename):
+    stat = os.stat(filename)
+    with open(filename, 'rb') as file, open(index_filename + '.tmp', 'wb') as index:
+        index.write(INDEX_HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns))
+        offset = 0  # Byte offset of the current line
+        setup_offset = None  # Where the setup waiting for its punchline starts
+        for line in file:
+            if setup_offset is None:
+                setup_offset = offset  # Lines alternate setup, punchline, setup, ...
+            else:
+                index.write(struct.pack('<Q', setup_offset))  # Only complete pairs are indexed
+                setup_offset = None
+            offset += len(line)
+    os.replace(index_filename + '.tmp', index_filename)
+
+
+# Read-only view of a joke corpus through its index, jokes are read from the memory-mapped file on demand
+class JokeCorpus:
+    def __init__(self, filename, index_filename):
+        with open(filename, 'rb') as file:
+            # An empty file cannot be mapped, but then there is nothing to read either
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(filename) else b''
+        with open(index_filename, 'rb') as index:
+            self.index = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = memoryview(self.index)[INDEX_HEADER.size:].cast('Q')  # Setup offsets, one per joke
+
+    # Number of jokes in the corpus
+    def __len__(self):
+        return len(self.offsets)
+
+    # Read the joke at a position, in the same form as load_jokes returns
+    def __getitem__(self, index):
+        start = self.offsets[index]
+        middle = self.data.find(b'\n', start) + 1  # The punchline starts on the next line
+        end = self.data.find(b'\n', middle)
+        if end == -1:
+            end = len(self.data)  # The last punchline may have no newline
+        setup = self.data[start:middle].decode('utf-8').strip()
+        punchline = self.data[middle:end].decode('utf-8').strip()
+        return {"setup": setup, "punchline": punchline}
+
+    # Pick a joke at random without touching the rest of the corpus
+    def random_joke(self):
+        return random.choice(self)
+
+
+# Function to check that an index file was built from the current version of a corpus
+def index_is_current(filename, index_filename, magic, header):
+    stat = os.stat(filename)
+    try:
+        with open(index_filename, 'rb') as index:
+            fields = header.unpack(index.read(header.size))
+    except (OSError, struct.error):
+        return False  # No index yet, or a broken one
+    return fields[:3] == (magic, stat.st_size, stat.st_mtime_ns)
+
+
+# Function to open a joke corpus, building its index first if it is missing or out of date
+@timed('jokes_open_corpus_seconds')
+def open_joke_corpus(filename, index_filename=None):
+    index_filename = index_filename or filename + '.idx'
+    if not index_is_current(filename, index_filename, INDEX_MAGIC, INDEX_HEADER):
+        build_joke_index(filename, index_filename)
+    return JokeCorpus(filename, index_filename)
+
+
+# Function to split text into lowercase search terms, leaving out stopwords and single characters
+def tokenize(text):
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 1 and word not in STOPWORDS]
+
+
+# Function to build the inverted index of a corpus: every term with the sorted list of jokes it appears in
+def build_search_index(corpus, filename, index_filename):
+    stat = os.stat(filename)
+    postings = {}  # Term -> array of joke positions
+    for joke_id in range(len(corpus)):
+        joke = corpus[joke_id]
+        for term in set(tokenize(joke["setup"] + " " + joke["punchline"])):
+            if term not in postings:
+                postings[term] = array('I')
+            postings[term].append(joke_id)  # Jokes are visited in order, so each list stays sorted
+    terms = sorted(postings)  # Code point order is also UTF-8 byte order, which the lookup relies on
+    encoded_terms = [term.encode('utf-8') for term in terms]
+
+    # Layout: header, term table, term text, padding to a 4-byte boundary, postings
+    strings_start = SEARCH_HEADER.size + TERM_ENTRY.size * len(terms)
+    postings_start = strings_start + sum(map(len, encoded_terms))
+    padding = -postings_start % 4
+    postings_start += padding
+    with open(index_filename + '.tmp', 'wb') as index:
+        index.write(SEARCH_HEADER.pack(SEARCH_MAGIC, stat.st_size, stat.st_mtime_ns, len(corpus), len(terms)))
+        string_offset, posting_offset = strings_start, postings_start
+        for term, encoded in zip(terms, encoded_terms):
+            index.write(TERM_ENTRY.pack(string_offset, len(encoded), posting_offset, len(postings[term])))
+            string_offset += len(encoded)
+            posting_offset += postings[term].itemsize * len(postings[term])
+        for encoded in encoded_terms:
+            index.write(encoded)
+        index.write(b'\0' * padding)
+        for term in terms:
+            postings[term].tofile(index)
+    os.replace(index_filename + '.tmp', index_filename)
+
+
+# Memory-mapped inverted index answering ranked "jokes about X" queries
+class JokeSearchIndex:
+    TIE_TOLERANCE = 1e-9  # Scores closer than this count as equal
+    def __init__(self, index_filename):
+        with open(index_filename, 'rb') as index:
+            self.data = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size, mtime_ns, self.joke_count, self.term_count = SEARCH_HEADER.unpack_from(self.data)
+        self.view = memoryview(self.data)
+
+    # Jokes containing a term, as a sorted memoryview of joke positions (empty if the term is unknown)
+    def postings(self, term):
+        encoded = term.encode('utf-8')
+        low, high = 0, self.term_count
+        while low < high:  # Binary search of the sorted term table
+            middle = (low + high) // 2
+            string_offset, length, posting_offset, count = TERM_ENTRY.unpack_from(
+                self.data, SEARCH_HEADER.size + middle * TERM_ENTRY.size)
+            found = self.data[string_offset:string_offset + length]
+            if found < encoded:
+                low = middle + 1
+            elif found > encoded:
+                high = middle
+            else:
+                return self.view[posting_offset:posting_offset + 4 * count].cast('I')
+        return memoryview(b'').cast('I')
+
+    # The best k matches for a query as (score, joke position) pairs, rarer terms counting for more.
+    # Jokes are visited in order through the postings of the terms that can still get a joke into the
+    # top k on their own (MaxScore), the other terms are only looked up for the jokes found that way.
+    @timed('jokes_search_seconds')
+    def search(self, query, k=10):
+        terms = []  # (weight, postings) of every query term in the index
+        for term in sorted(set(tokenize(query))):
+            postings = self.postings(term)
+            if len(postings):
+                # Inverse document frequency, as in BM25
+                terms.append((math.log(1 + (self.joke_count - len(postings) + 0.5) / (len(postings) + 0.5)), postings))
+        terms.sort(key=lambda term: term[0])  # Most common terms, with the least weight, first
+        prefix = [0.0]  # prefix[i] is the most a joke can score from the first i terms
+        for weight, postings in terms:
+            prefix.append(prefix[-1] + weight)
+
+        positions = [0] * len(terms)  # How far through each term's postings the search is
+        top = []  # Min-heap of (score, -joke position) holding the best k so far, the worst on top
+        threshold = -1.0  # Score a joke has to beat to get into a full top k
+        essential = 0 if k > 0 else len(terms)  # Terms before this cannot get a joke into the top k on their own
+        while essential < len(terms):
+            # Jokes are visited in order, so a later joke that only ties with the top k never gets in
+            joke_id = None
+            for i in range(essential, len(terms)):
+                postings = terms[i][1]
+                if positions[i] < len(postings) and (joke_id is None or postings[positions[i]] < joke_id):
+                    joke_id = postings[positions[i]]
+            if joke_id is None:
+                break  # The postings of every term that matters are used up
+            score = 0.0
+            for i in range(essential, len(terms)):
+                weight, postings = terms[i]
+                if positions[i] < len(postings) and postings[positions[i]] == joke_id:
+                    score += weight
+                    positions[i] += 1
+            for i in range(essential - 1, -1, -1):
+                if score + prefix[i + 1] <= threshold:
+                    break  # Even matching every term left would not get this joke in
+                weight, postings = terms[i]
+                positions[i] = bisect_left(postings, joke_id, positions[i])
+                if positions[i] < len(postings) and postings[positions[i]] == joke_id:
+                    score += weight
+            if len(top) < k:
+                heapq.heappush(top, (score, -joke_id))
+            elif score > threshold:
+                heapq.heapreplace(top, (score, -joke_id))
+            else:
+                continue
+            if len(top) == k:
+                threshold = top[0][0]
+                # Allow for rounding, as the same weights can be added up in a different order
+                while essential < len(terms) and prefix[essential + 1] <= threshold + self.TIE_TOLERANCE:
+                    essential += 1
+        return sorted(((score, -negated) for score, negated in top), key=lambda match: (-match[0], match[1]))
+
+
+# Function to open the search index of a corpus, building it first if it is missing or out of date
+def open_search_index(filename, corpus, index_filename=None):
+    index_filename = index_filename or filename + '.fts'
+    if not index_is_current(filename, index_filename, SEARCH_MAGIC, SEARCH_HEADER):
+        build_search_index(corpus, filename, index_filename)
+    return JokeSearchIndex(index_filename)
+
+
+# Which jokes have had their punchline asked for, shared by every scheduler over the same corpus.
+# Clicks are numbered as they come in and each joke keeps the number of its first one, so a scheduler can
+# still tell which jokes had been clicked when its cycle started, however many clicks have come in since.
+class JokePopularity:
+    def __init__(self, size):
+        self.first_click = array('Q', [0]) * size  # Number of each joke's first click, 0 if never clicked
+        self.clicks = 0  # Clicks so far
+
+    # Count a punchline click for a joke
+    def record(self, index):
+        self.clicks += 1
+        if not self.first_click[index]:
+            self.first_click[index] = self.clicks
+
+    # Whether a joke had been clicked by the time the given number of clicks had come in
+    def clicked_by(self, index, clicks):
+        return 0 < self.first_click[index] <= clicks
+
+
+# Hands one client every joke once per cycle in a shuffled order, without storing the shuffle
+class JokeScheduler:
+    __slots__ = ('size', 'seed', 'cycle', 'position', 'half_bits', 'keys', 'popularity', 'clicks', 'first_pass')
+    ROUNDS = 4  # Rounds of the Feistel network that does the shuffling
+    UNCLICKED_SHARE = 0.25  # Share of the never-clicked jokes told in the first pass along with the clicked ones
+
+    def __init__(self, size, seed=None, popularity=None):
+        self.size = size  # Number of jokes
+        self.seed = random.getrandbits(64) if seed is None else seed  # Picks this client's shuffles
+        self.popularity = popularity  # Optional JokePopularity used to favour popular jokes
+        # The shuffle works on the smallest even number of bits covering every joke
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self.start_cycle(0)
+
+    # Start a new pass over the corpus with a fresh shuffle
+    def start_cycle(self, cycle):
+        self.cycle = cycle
+        self.position = 0  # How far through the shuffled order this cycle is
+        rng = random.Random(f"{self.seed}:{cycle}")
+        self.keys = tuple(rng.getrandbits(64) for _ in range(self.ROUNDS))
+        # Popularity as it stands now decides the order for the whole cycle, later clicks count from the next
+        self.clicks = 0 if self.popularity is None else self.popularity.clicks
+        self.first_pass = self.popularity is not None
+
+    # Map a position to its place in the shuffled order, a bijection on numbers of 2 * half_bits bits
+    def permute(self, value):
+        mask = (1 << self.half_bits) - 1
+        left, right = value >> self.half_bits, value & mask
+        for key in self.keys:
+            left, right = right, left ^ ((((right ^ key) * 0x9E3779B97F4A7C15) >> 29) & mask)
+        return (left << self.half_bits) | right
+
+    # Whether a joke belongs to the first pass of this cycle: every joke clicked before the cycle started,
+    # and a fixed share of the others chosen by hashing, which only changes with the cycle's keys
+    def in_first_pass(self, index):
+        if self.popularity.clicked_by(index, self.clicks):
+            return True
+        return ((((index ^ self.keys[0]) * 0x9E3779B97F4A7C15) >> 32) & 0xFFFF) < self.UNCLICKED_SHARE * 0x10000
+
+    # The next joke's position in the corpus, never repeating one until every joke has had its turn.
+    # With popularity the shuffled order is walked twice per cycle: the first pass tells the jokes that
+    # were popular when the cycle started (and some others, so there is still variety), the second pass
+    # tells the rest. Which pass a joke belongs to cannot change during the cycle, so each is told once.
+    def next_index(self):
+        if not self.size:
+            raise IndexError("there are no jokes to pick from")
+        while True:
+            if self.position >> (2 * self.half_bits):
+                if self.first_pass:
+                    self.first_pass = False  # Walk the same order again for the jokes the first pass left
+                    self.position = 0
+                else:
+                    self.start_cycle(self.cycle + 1)  # Every joke has come up, reshuffle
+            index = self.permute(self.position)
+            self.position += 1
+            if index >= self.size:
+                continue  # Outside the corpus, walk on to the next position
+            if self.popularity is None or self.in_first_pass(index) == self.first_pass:
+                return index
+
+
 # The User Interface of the tkinter program
 class JokeApp:
-    def __init__(self, root, jokes):
+    def __init__(self, root, jokes=()):
         self.root = root
         self.root.title("Alexa, Tell Me a Joke")
         self.jokes = jokes
@@ -37,16 +340,81 @@ class JokeApp:
         self.show_punchline_button = tk.Button(self.root, text="Show Punchline", font=("Arial", 12), command=self.show_punchline)
         self.show_punchline_button.pack(pady=5)
 
+        # The search box and button for jokes about something in particular
+        self.search_entry = tk.Entry(self.root, font=("Arial", 12))
+        self.search_entry.pack(pady=5)
+        self.search_entry.bind("<Return>", lambda event: self.search_jokes())
+        self.search_button = tk.Button(self.root, text="Tell me a Joke About...", font=("Arial", 12),
+                                       command=self.search_jokes, state='disabled')
+        self.search_button.pack(pady=5)
+
         # The quit button to quit the app
         self.quit_button = tk.Button(self.root, text="Quit", font=("Arial", 12), command=self.root.quit)
         self.quit_button.pack(pady=20)
 
         # Holds the current joke
         self.current_joke = None
+        self.current_index = None  # Position of the current joke in the corpus
+        self.punchline_shown = False  # Whether the current joke's punchline has been asked for
 
-    # Function that selects a random joke
+        # Picks jokes without repeats, favouring ones whose punchlines get asked for
+        self.scheduler = None
+        self.popularity = None
+
+        # Inverted index over the jokes, built after they load, and the matches of the last search
+        self.search_index = None
+        self.search_query = None
+        self.search_results = []
+        self.search_position = 0
+
+        # Worker pool used to load jokes without freezing the window
+        self.tasks = BackgroundTasks(self.root)
+
+    # Function called once the window is showing
+    def start(self, filename="randomJokes.txt"):
+        self.load_jokes_in_background(filename)
+
+    # Function that loads the jokes on a worker thread, the window stays usable meanwhile
+    def load_jokes_in_background(self, filename):
+        self.tell_joke_button.config(state='disabled')
+        self.setup_label.config(text="Loading jokes...")
+        self.tasks.submit(lambda task: open_joke_corpus(filename), on_done=self.jokes_loaded, on_error=self.jokes_failed)
+        self.corpus_filename = filename
+
+    # Function called once the jokes have loaded
+    def jokes_loaded(self, jokes):
+        self.jokes = jokes
+        if not jokes:
+            self.setup_label.config(text="No jokes available.")
+        else:
+            self.setup_label.config(text="Alexa, tell me a joke!")
+            self.tell_joke_button.config(state='normal')
+            # Searching waits for its index, which can take a while to build the first time
+            self.tasks.submit(lambda task: open_search_index(self.corpus_filename, jokes),
+                              on_done=self.search_index_loaded)
+
+    # Function called once the search index is ready
+    def search_index_loaded(self, search_index):
+        self.search_index = search_index
+        self.search_button.config(state='normal')
+
+    # Function called if the jokes could not be loaded
+    def jokes_failed(self, error):
+        self.setup_label.config(text=f"Could not load jokes: {error}")
+
+    # Function that sets up the scheduler and click counts the first time they are needed for these jokes
+    def prepare_scheduler(self):
+        if self.scheduler is None or self.scheduler.size != len(self.jokes):
+            self.popularity = JokePopularity(len(self.jokes))
+            self.scheduler = JokeScheduler(len(self.jokes), popularity=self.popularity)
+
+    # Function that selects the next joke in this client's shuffled order
     def show_joke(self):
-        self.current_joke = random.choice(self.jokes)
+        self.prepare_scheduler()
+        self.current_index = self.scheduler.next_index()
+        count('jokes_told_total')
+        self.current_joke = self.jokes[self.current_index]
+        self.punchline_shown = False
         self.setup_label.config(text=self.current_joke["setup"])
         self.punchline_label.config(text="")  # Clear the previous punchline
 
@@ -54,15 +422,33 @@ class JokeApp:
     def show_punchline(self):
         if self.current_joke:
             self.punchline_label.config(text=self.current_joke["punchline"])
+            if not self.punchline_shown:
+                self.popularity.record(self.current_index)  # Wanting the punchline counts as interest
+                self.punchline_shown = True
+
+    # Function that tells the best joke about what is in the search box, the next best if asked again
+    def search_jokes(self):
+        query = self.search_entry.get()
+        if self.search_index is None or not query.strip():
+            return
+        if query != self.search_query:
+            self.search_query = query
+            self.search_results = [joke_id for score, joke_id in self.search_index.search(query)]
+            self.search_position = 0
+        if not self.search_results:
+            self.current_joke = None
+            self.setup_label.config(text=f"Sorry, I don't know any jokes about {query.strip()}.")
+            self.punchline_label.config(text="")
+            return
+        self.prepare_scheduler()
+        self.current_index = self.search_results[self.search_position % len(self.search_results)]
+        self.search_position += 1
+        self.current_joke = self.jokes[self.current_index]
+        self.punchline_shown = False
+        self.setup_label.config(text=self.current_joke["setup"])
+        self.punchline_label.config(text="")
 
 # Running the application
 if __name__ == "__main__":
-    # Load jokes from the file
-    jokes = load_jokes("randomJokes.txt")
-
-    if not jokes:
-        print("No jokes available.")
-    else:
-        root = tk.Tk()
-        app = JokeApp(root, jokes)
-        root.mainloop()
+    # Load jokes from the file once the window is up
+    launch(JokeApp)
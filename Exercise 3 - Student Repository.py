@@ -1,5 +1,104 @@
-import tkinter as tk
-from tkinter import messagebox, scrolledtext, simpledialog
+from array import array
+from background_tasks import BackgroundTasks
+from bisect import bisect_left, insort
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from instrumentation import count, metrics, timed, timer
+from itertools import compress
+from launcher import launch, lazy_import
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+# Only imported once a window is opened, so marks files can be graded without tkinter
+tk = lazy_import('tkinter')
+messagebox = lazy_import('tkinter.messagebox')
+simpledialog = lazy_import('tkinter.simpledialog')
+
+# Grade letters in the order of their grade codes
+GRADES = "ABCDF"
+# Lowest percentage needed for each of A, B, C and D, anything below the last is an F
+GRADE_BOUNDARIES = (70, 60, 50, 40)
+# Total marks available (60 coursework plus 100 exam)
+MAX_MARKS = 160
+# Percentiles reported by cohort_statistics
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Function to determine a grade letter from a percentage
+def grade_for_percentage(percentage, boundaries=GRADE_BOUNDARIES):
+    # Walk down the grading scale until the percentage clears a boundary
+    for grade, boundary in zip(GRADES, boundaries):
+        if percentage >= boundary:
+            return grade
+    return GRADES[-1]  # Failed
+
+
+# Function to build a table mapping every possible total mark to its grade code
+def build_grade_lookup(boundaries=GRADE_BOUNDARIES, max_marks=MAX_MARKS):
+    return bytes(GRADES.index(grade_for_percentage((total / max_marks) * 100, boundaries))
+                 for total in range(max_marks + 1))
+
+
+# Function to grade a whole column of total marks in one pass, returning an array of grade codes
+def grade_cohort(total_marks, boundaries=GRADE_BOUNDARIES, max_marks=MAX_MARKS):
+    lookup = build_grade_lookup(boundaries, max_marks)
+    if not total_marks or (min(total_marks) >= 0 and max(total_marks) <= max_marks):
+        return array('B', map(lookup.__getitem__, total_marks))  # Every total is in the table
+    # Out of range totals (bad data) fall back to grading one by one
+    return array('B', (GRADES.index(grade_for_percentage((total / max_marks) * 100, boundaries))
+                       for total in total_marks))
+
+
+# Function to calculate cohort statistics for a column of total marks in one counting pass
+def cohort_statistics(total_marks, boundaries=GRADE_BOUNDARIES, max_marks=MAX_MARKS, percentiles=PERCENTILES):
+    return statistics_from_counts(Counter(total_marks), boundaries, max_marks, percentiles)
+
+
+# Function to calculate cohort statistics from how many students got each total mark,
+# so counts gathered separately (for example by worker processes) can simply be added up
+def statistics_from_counts(total_counts, boundaries=GRADE_BOUNDARIES, max_marks=MAX_MARKS, percentiles=PERCENTILES):
+    counts = sorted(total_counts.items())  # (total, how many students) in ascending order
+    count = sum(n for total, n in counts)
+    stats = {
+        'count': count,
+        'mean': 0.0,
+        'median': 0.0,
+        'stdev': 0.0,
+        'grades': dict.fromkeys(GRADES, 0),
+        'percentiles': dict.fromkeys(percentiles, 0.0),
+    }
+    if not count:
+        return stats  # Avoid division by zero for an empty cohort
+
+    # Work in percentages so the results match Student.percentage
+    scale = 100 / max_marks
+    mean = sum(total * n for total, n in counts) / count
+    variance = sum(n * (total - mean) ** 2 for total, n in counts) / count
+    stats['mean'] = mean * scale
+    stats['stdev'] = variance ** 0.5 * scale
+    stats['median'] = (_total_at_rank(counts, (count - 1) // 2) + _total_at_rank(counts, count // 2)) / 2 * scale
+    for percentile in percentiles:
+        # Nearest-rank percentile
+        rank = max(int(-(-percentile * count // 100)) - 1, 0)
+        stats['percentiles'][percentile] = _total_at_rank(counts, rank) * scale
+    for total, n in counts:
+        stats['grades'][grade_for_percentage(total * scale, boundaries)] += n
+    return stats
+
+
+# Function to find the total at a given 0-based rank in a sorted list of (total, count) pairs
+def _total_at_rank(counts, rank):
+    for total, n in counts:
+        if rank < n:
+            return total
+        rank -= n
+    return counts[-1][0]
+
 
 # Define a class to represent each student and their details
 class Student:
@@ -13,22 +112,12 @@ class Student:
         # Calculate total coursework marks and overall total marks
         self.total_coursework = sum(coursework_marks)  # Sum up the coursework marks
         self.total_marks = self.total_coursework + exam_mark  # Calculate overall marks (coursework + exam)
-        self.percentage = (self.total_marks / 160) * 100  # Calculate percentage out of 100
+        self.percentage = (self.total_marks / MAX_MARKS) * 100  # Calculate percentage out of 100
         self.grade = self.calculate_grade()  # Determine the grade based on the percentage
 
     # Method to determine the student's grade based on their percentage
-    def calculate_grade(self):
-        # Use a simple grading scale to assign grades
-        if self.percentage >= 70:
-            return 'A'  # Excellent performance
-        elif self.percentage >= 60:
-            return 'B'  # Good performance
-        elif self.percentage >= 50:
-            return 'C'  # Average performance
-        elif self.percentage >= 40:
-            return 'D'  # Below average performance
-        else:
-            return 'F'  # Failed
+    def calculate_grade(self, boundaries=GRADE_BOUNDARIES):
+        return grade_for_percentage(self.percentage, boundaries)
 
     # Method to format student details for display purposes
     def display(self):
@@ -39,31 +128,981 @@ class Student:
                 f"Grade: {self.grade}\n\n")  # Display all important info in a readable format
 
 
+# A lightweight view of one row of a StudentTable with the same attributes as Student
+class StudentView:
+    __slots__ = ('table', 'row')  # No per-view __dict__, a view is just a table and a row number
+
+    def __init__(self, table, row):
+        self.table = table  # The table holding the data
+        self.row = row  # Row of the student in the table, only valid until the table is compacted
+
+    @property
+    def student_number(self):
+        return self.table.student_numbers[self.row]
+
+    @property
+    def name(self):
+        return self.table.get_name(self.row)
+
+    @name.setter
+    def name(self, value):
+        self.table.update(self.student_number, value, self.coursework_marks, self.exam_mark)
+
+    @property
+    def coursework_marks(self):
+        return [column[self.row] for column in self.table.coursework_columns]
+
+    @coursework_marks.setter
+    def coursework_marks(self, value):
+        self.table.update(self.student_number, self.name, value, self.exam_mark)
+
+    @property
+    def exam_mark(self):
+        return self.table.exam_marks[self.row]
+
+    @exam_mark.setter
+    def exam_mark(self, value):
+        self.table.update(self.student_number, self.name, self.coursework_marks, value)
+
+    @property
+    def total_coursework(self):
+        return self.table.total_courseworks[self.row]
+
+    @property
+    def total_marks(self):
+        return self.table.total_marks[self.row]
+
+    @property
+    def percentage(self):
+        return (self.total_marks / self.table.max_marks) * 100  # Derived on demand rather than stored
+
+    @property
+    def grade(self):
+        return GRADES[self.table.grade_codes[self.row]]
+
+    # Method to determine the student's grade using the table's grading scale
+    def calculate_grade(self):
+        return grade_for_percentage(self.percentage, self.table.boundaries)
+
+    # Reuse the Student method so views display exactly like Student objects
+    display = Student.display
+
+
+# Sorted collection of keys kept in chunks so inserts and removals only shift one small chunk
+class SortedIndex:
+    CHUNK_SIZE = 512  # Chunks are split once they grow past twice this size
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self.chunks = [keys[i:i + self.CHUNK_SIZE] for i in range(0, len(keys), self.CHUNK_SIZE)]
+        self.maxes = [chunk[-1] for chunk in self.chunks]  # Largest key of each chunk, for bisecting
+        self.size = len(keys)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield from chunk
+
+    # The key at a position in sorted order, found by skipping whole chunks
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("sorted index out of range")
+        for chunk in self.chunks:
+            if index < len(chunk):
+                return chunk[index]
+            index -= len(chunk)
+
+    def __contains__(self, key):
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            return False
+        chunk = self.chunks[i]
+        return chunk[bisect_left(chunk, key)] == key
+
+    # Insert a key, keeping everything in order
+    def add(self, key):
+        if not self.chunks:
+            self.chunks.append([key])
+            self.maxes.append(key)
+        else:
+            i = bisect_left(self.maxes, key)
+            if i == len(self.maxes):
+                i -= 1  # Bigger than everything, goes at the end of the last chunk
+                self.chunks[i].append(key)
+                self.maxes[i] = key
+            else:
+                insort(self.chunks[i], key)
+            chunk = self.chunks[i]
+            if len(chunk) > 2 * self.CHUNK_SIZE:
+                # Split an oversized chunk in two
+                self.chunks[i:i + 1] = [chunk[:self.CHUNK_SIZE], chunk[self.CHUNK_SIZE:]]
+                self.maxes[i:i + 1] = [chunk[self.CHUNK_SIZE - 1], chunk[-1]]
+        self.size += 1
+
+    # Remove a key, raising ValueError if it is not there
+    def remove(self, key):
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            raise ValueError(f"{key!r} is not in the index")
+        chunk = self.chunks[i]
+        j = bisect_left(chunk, key)
+        if chunk[j] != key:
+            raise ValueError(f"{key!r} is not in the index")
+        del chunk[j]
+        if chunk:
+            self.maxes[i] = chunk[-1]
+        else:
+            # Drop empty chunks so bisecting the maxes stays correct
+            del self.chunks[i]
+            del self.maxes[i]
+        self.size -= 1
+
+    # Iterate over the keys from lo (inclusive) up to hi (exclusive), either bound may be None
+    def irange(self, lo=None, hi=None):
+        i = 0 if lo is None else bisect_left(self.maxes, lo)
+        j = 0 if lo is None or i == len(self.chunks) else bisect_left(self.chunks[i], lo)
+        for chunk in self.chunks[i:]:
+            for key in chunk[j:]:
+                if hi is not None and key >= hi:
+                    return
+                yield key
+            j = 0
+
+
+# Student number -> row map held in one typed array of rows, using open addressing with linear probing.
+# The student numbers are not stored again, each slot's number is read back from the table's own column,
+# so the map costs a few bytes per student where a dict costs an entry and two int objects.
+class RowMap:
+    EMPTY = -1  # Slot with no row in it
+    MAX_LOAD = 0.7  # Share of the slots that may be in use before the slots are doubled
+
+    def __init__(self, keys, rows=0):
+        self.keys = keys  # Column of student numbers, indexed by row
+        self.size = 0  # Student numbers in the map
+        self.allocate(8)
+        self.reserve(rows)
+        for row in range(rows):
+            self[keys[row]] = row  # Map the first rows of the column, as compact does
+
+    # Replace the slots with an empty array of a power of two size
+    def allocate(self, capacity):
+        self.slots = array('i', [self.EMPTY]) * capacity
+        self.mask = capacity - 1
+        self.shift = 65 - capacity.bit_length()  # Keep the top log2(capacity) bits of the hash
+
+    # Make room for a number of student numbers up front, so filling the map never has to move them
+    def reserve(self, count):
+        capacity = len(self.slots)
+        while count > self.MAX_LOAD * capacity:
+            capacity *= 2
+        if capacity != len(self.slots):
+            self.resize(capacity)
+
+    # Move every row into a new array of slots
+    def resize(self, capacity):
+        rows = [row for row in self.slots if row != self.EMPTY]
+        self.allocate(capacity)
+        for row in rows:
+            self.slots[self.find(self.keys[row])] = row
+
+    # Preferred slot of a student number, multiplying by a large odd constant so runs of numbers spread out
+    def home(self, key):
+        return ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> self.shift
+
+    # Slot holding a student number, or the empty slot where it would go
+    def find(self, key):
+        slots, keys, i = self.slots, self.keys, self.home(key)
+        while True:
+            row = slots[i]
+            if row == self.EMPTY or keys[row] == key:
+                return i
+            i = (i + 1) & self.mask
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        return self.slots[self.find(key)] != self.EMPTY
+
+    def __getitem__(self, key):
+        row = self.slots[self.find(key)]
+        if row == self.EMPTY:
+            raise KeyError(key)
+        return row
+
+    # Row of a student number, or default if it is not in the map
+    def get(self, key, default=None):
+        row = self.slots[self.find(key)]
+        return default if row == self.EMPTY else row
+
+    def __setitem__(self, key, row):
+        i = self.find(key)
+        if self.slots[i] == self.EMPTY:
+            if self.size + 1 > self.MAX_LOAD * len(self.slots):
+                self.resize(2 * len(self.slots))  # Too full for short probes
+                i = self.find(key)
+            self.size += 1
+        self.slots[i] = row
+
+    # Remove a student number, moving later rows of its probe run back so no lookup stops short
+    def __delitem__(self, key):
+        i = self.find(key)
+        if self.slots[i] == self.EMPTY:
+            raise KeyError(key)
+        j = i
+        while True:
+            j = (j + 1) & self.mask
+            row = self.slots[j]
+            if row == self.EMPTY:
+                break
+            # The row at j can fill the hole at i unless its preferred slot lies after the hole
+            if (j - self.home(self.keys[row])) & self.mask >= (j - i) & self.mask:
+                self.slots[i] = row
+                i = j
+        self.slots[i] = self.EMPTY
+        self.size -= 1
+
+
+# How each sort criterion turns a table row into a sort key
+SORT_KEYS = {
+    'name': lambda table, row: table.get_name(row),  # Alphabetically by name
+    'marks': lambda table, row: -table.total_marks[row],  # By total marks, highest first
+    'grade': lambda table, row: table.grade_codes[row],  # By grade, A first
+    'number': lambda table, row: table.student_numbers[row],  # By student number
+}
+
+
+# Smallest and largest values the typed columns can hold: marks and their totals are 'h', student numbers 'q'
+MARK_LIMITS = (-2 ** 15, 2 ** 15 - 1)
+STUDENT_NUMBER_LIMITS = (-2 ** 63, 2 ** 63 - 1)
+
+
+# Function to check that a student's fields fit the table's columns, raising ValueError if they do not
+def check_student_fields(student_number, coursework_marks, exam_mark):
+    if not STUDENT_NUMBER_LIMITS[0] <= student_number <= STUDENT_NUMBER_LIMITS[1]:
+        raise ValueError(f"student number {student_number} is out of range")
+    if len(coursework_marks) != 3:
+        raise ValueError(f"expected 3 coursework marks but found {len(coursework_marks)}")
+    total_coursework = sum(coursework_marks)
+    # The totals are stored too, so they have to fit as well as each mark
+    for mark in (*coursework_marks, exam_mark, total_coursework, total_coursework + exam_mark):
+        if not MARK_LIMITS[0] <= mark <= MARK_LIMITS[1]:
+            raise ValueError(f"mark {mark} is out of range")
+
+
+# Column-oriented store of student records backed by typed arrays
+class StudentTable:
+    # Deleted rows are compacted away once there are more of them than this and than live rows
+    MIN_COMPACT = 1024
+
+    def __init__(self, boundaries=GRADE_BOUNDARIES, max_marks=MAX_MARKS):
+        self.boundaries = boundaries  # Grading scale used for the grade codes
+        self.max_marks = max_marks  # Total marks that count as 100%
+        self.grade_lookup = build_grade_lookup(boundaries, max_marks)  # Grade code for every possible total
+
+        self.student_numbers = array('q')  # Unique identifiers
+        self.coursework_columns = [array('h') for _ in range(3)]  # One column per coursework mark
+        self.exam_marks = array('h')  # Exam marks
+        self.total_courseworks = array('h')  # Sum of the coursework marks
+        self.total_marks = array('h')  # Coursework plus exam
+        self.grade_codes = array('B')  # Index into GRADES
+        self.live = bytearray()  # 1 for a current row, 0 for a deleted one waiting to be compacted
+        self.deleted_rows = array('q')  # The rows marked 0 in live, ascending, to map positions onto rows
+
+        # Names are kept as UTF-8 bytes in a single buffer instead of one str object each
+        self.name_data = bytearray()
+        self.name_starts = array('Q')  # Where each name starts in name_data
+        self.name_lengths = array('I')  # How many bytes each name takes
+
+        # Indexes and aggregates kept up to date by add, update and delete
+        self.marks_sum = 0  # Total marks of every current student, for the average
+        self.row_of = RowMap(self.student_numbers)  # Student number -> row
+        self.orders = {}  # Sort criteria -> SortedIndex of sort keys, each ending in the student number
+        self.name_rows = None  # Rows in (name, student number) order, built by the first name search
+
+    # Number of students in the table
+    def __len__(self):
+        return len(self.row_of)
+
+    # Check whether a student number is in the table
+    def __contains__(self, student_number):
+        return student_number in self.row_of
+
+    # Iterate over views of every student in the order they were added
+    def __iter__(self):
+        for row in range(len(self.live)):
+            if self.live[row]:
+                yield StudentView(self, row)
+
+    # All the per-row columns, used when rows are compacted or reordered
+    def columns(self):
+        return [self.student_numbers, *self.coursework_columns, self.exam_marks,
+                self.total_courseworks, self.total_marks, self.grade_codes,
+                self.name_starts, self.name_lengths]
+
+    # Decode the name stored for a row
+    def get_name(self, row):
+        start = self.name_starts[row]
+        return self.name_data[start:start + self.name_lengths[row]].decode('utf-8')
+
+    # Store a new name for a row, the old bytes are reclaimed by compact
+    def set_name(self, row, name):
+        encoded = name.encode('utf-8')
+        self.name_starts[row] = len(self.name_data)
+        self.name_lengths[row] = len(encoded)
+        self.name_data += encoded
+
+    # Size the student number index for a count of students about to be added. The typed columns cannot
+    # reserve space without filling it, they grow by over-allocating as rows are appended.
+    def reserve(self, count):
+        self.row_of.reserve(len(self.row_of) + count)
+
+    # Hand out a view for a student number, or None if there is no such student
+    def get(self, student_number):
+        row = self.row_of.get(student_number)
+        return None if row is None else StudentView(self, row)
+
+    # Where a row sorts in the name index
+    def name_key(self, row):
+        return self.get_name(row), self.student_numbers[row]
+
+    # The rows in name order, sorted once the first time a name search needs them and kept up to date after
+    def name_order(self):
+        if self.name_rows is None:
+            self.name_rows = array('i', sorted((view.row for view in self), key=self.name_key))
+        return self.name_rows
+
+    # Position in the name index of the first row whose name key is not below the given one
+    def name_position(self, key):
+        rows = self.name_order()
+        low, high = 0, len(rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self.name_key(rows[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    # Views of the students whose name starts with the given text, in name order
+    def find_by_name_prefix(self, prefix):
+        rows = self.name_order()
+        for position in range(self.name_position((prefix,)), len(rows)):
+            if not self.get_name(rows[position]).startswith(prefix):
+                break
+            yield StudentView(self, rows[position])
+
+    # Views of the students with lo <= name < hi, in name order
+    def find_by_name_range(self, lo, hi):
+        rows = self.name_order()
+        for row in rows[self.name_position((lo,)):self.name_position((hi,))]:
+            yield StudentView(self, row)
+
+    # Sort key of a row for the given criteria, the student number breaks any ties
+    def sort_key(self, criteria, row):
+        return (*(SORT_KEYS[criterion](self, row) for criterion in criteria), self.student_numbers[row])
+
+    # The maintained sort order for some criteria, built with one full sort the first time it is asked for,
+    # calling progress(done, total) while the keys are collected if it is given
+    def order(self, criteria, progress=None):
+        criteria = tuple(criteria)
+        if criteria not in self.orders:
+            for criterion in criteria:
+                if criterion not in SORT_KEYS:
+                    raise ValueError(f"unknown sort criterion {criterion!r}")
+            keys = []
+            for view in self:
+                keys.append(self.sort_key(criteria, view.row))
+                if progress is not None and len(keys) % BATCH_SIZE == 0:
+                    progress(len(keys), len(self))
+            self.orders[criteria] = SortedIndex(keys)  # Only installed once it is complete
+        return self.orders[criteria]
+
+    # View of the student at a position, either in the order they were added or in a sort order
+    def at(self, index, criteria=None):
+        if criteria:
+            return self.get(self.order(criteria)[index][-1])
+        if not 0 <= index < len(self):
+            raise IndexError("student index out of range")
+        return StudentView(self, self.row_at(index))
+
+    # Row holding the student at a position in the order they were added, skipping deleted rows
+    def row_at(self, index):
+        # deleted_rows[j] - j live rows come before the j-th deleted row, which never decreases with j,
+        # so the student sits after the first j deleted rows where j is the first with more than index
+        low, high = 0, len(self.deleted_rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self.deleted_rows[middle] - middle > index:
+                high = middle
+            else:
+                low = middle + 1
+        return index + low
+
+    # Average percentage of the cohort from the running total, without rescanning the marks
+    def average_percentage(self):
+        return (self.marks_sum / len(self) / self.max_marks) * 100 if len(self) else 0  # Avoid division by zero
+
+    # Views of every student sorted by the given criteria, for example ('grade', 'name')
+    def ordered(self, criteria):
+        for key in self.order(criteria):
+            yield self.get(key[-1])
+
+    # Add a new student from its raw fields, rejecting duplicate student numbers and values that do not fit.
+    # Everything is checked before the first column changes, so a rejected student leaves no trace.
+    def add(self, student_number, name, coursework_marks, exam_mark):
+        if student_number in self.row_of:
+            raise ValueError(f"student number {student_number} already exists")
+        check_student_fields(student_number, coursework_marks, exam_mark)
+        encoded = name.encode('utf-8')
+        total_coursework = sum(coursework_marks)  # Sum up the coursework marks
+        total_marks = total_coursework + exam_mark  # Overall marks (coursework + exam)
+        row = len(self.student_numbers)
+        self.student_numbers.append(student_number)
+        for column, mark in zip(self.coursework_columns, coursework_marks):
+            column.append(mark)
+        self.exam_marks.append(exam_mark)
+        self.total_courseworks.append(total_coursework)
+        self.total_marks.append(total_marks)
+        self.grade_codes.append(self.grade_code(total_marks))
+        self.live.append(1)
+        self.marks_sum += total_marks
+        self.name_starts.append(len(self.name_data))
+        self.name_lengths.append(len(encoded))
+        self.name_data += encoded
+        self.row_of[student_number] = row  # Once the row is complete, the map reads the number back from it
+        if self.name_rows is not None:
+            self.name_rows.insert(self.name_position(self.name_key(row)), row)
+        for criteria, order in self.orders.items():
+            order.add(self.sort_key(criteria, row))  # Slot the new student into every sort order
+
+    # Add a Student (or anything with the same attributes) to the table
+    def append(self, student):
+        self.add(student.student_number, student.name, student.coursework_marks, student.exam_mark)
+
+    # Add a batch of parsed rows as produced by iter_student_batches, collecting rejected rows if asked
+    def extend(self, rows, bad_rows=None):
+        for row in rows:
+            try:
+                self.add(*row)
+            except ValueError as e:
+                if bad_rows is None:
+                    raise
+                bad_rows.append(str(e))
+
+    # Replace the details of a student and recalculate the derived columns
+    def update(self, student_number, name, coursework_marks, exam_mark):
+        row = self.row_of[student_number]
+        check_student_fields(student_number, coursework_marks, exam_mark)
+        name.encode('utf-8')  # Fails here rather than half way through the update
+        old_keys = [self.sort_key(criteria, row) for criteria in self.orders]  # Where the student sorts now
+        total_coursework = sum(coursework_marks)
+        total_marks = total_coursework + exam_mark
+        for column, mark in zip(self.coursework_columns, coursework_marks):
+            column[row] = mark
+        self.exam_marks[row] = exam_mark
+        self.total_courseworks[row] = total_coursework
+        self.marks_sum += total_marks - self.total_marks[row]
+        self.total_marks[row] = total_marks
+        self.grade_codes[row] = self.grade_code(total_marks)
+        if name != self.get_name(row):
+            if self.name_rows is not None:
+                del self.name_rows[self.name_position(self.name_key(row))]
+            self.set_name(row, name)
+            if self.name_rows is not None:
+                self.name_rows.insert(self.name_position(self.name_key(row)), row)
+        for (criteria, order), old_key in zip(self.orders.items(), old_keys):
+            new_key = self.sort_key(criteria, row)
+            if new_key != old_key:
+                # Move the student to their new place in this order
+                order.remove(old_key)
+                order.add(new_key)
+
+    # Remove a student, the row is only marked as deleted until the next compaction
+    def delete(self, student_number):
+        row = self.row_of[student_number]
+        for criteria, order in self.orders.items():
+            order.remove(self.sort_key(criteria, row))
+        if self.name_rows is not None:
+            del self.name_rows[self.name_position(self.name_key(row))]
+        del self.row_of[student_number]
+        self.live[row] = 0
+        insort(self.deleted_rows, row)
+        self.marks_sum -= self.total_marks[row]
+        deleted = len(self.live) - len(self.row_of)
+        if deleted > self.MIN_COMPACT and deleted > len(self.row_of):
+            self.compact()
+
+    # Look up the grade code for a total mark, grading directly if it is outside the table
+    def grade_code(self, total_marks):
+        if 0 <= total_marks <= self.max_marks:
+            return self.grade_lookup[total_marks]
+        return GRADES.index(grade_for_percentage((total_marks / self.max_marks) * 100, self.boundaries))
+
+    # Switch to a different grading scale and regrade every student in one pass
+    def regrade(self, boundaries=GRADE_BOUNDARIES, max_marks=MAX_MARKS):
+        self.boundaries = boundaries
+        self.max_marks = max_marks
+        self.grade_lookup = build_grade_lookup(boundaries, max_marks)
+        self.grade_codes = grade_cohort(self.total_marks, boundaries, max_marks)
+        for criteria in self.orders:
+            if 'grade' in criteria:
+                # Grades have moved, rebuild the orders that depend on them
+                self.orders[criteria] = SortedIndex(self.sort_key(criteria, view.row) for view in self)
+
+    # Mean, median, standard deviation, grade counts and percentiles for the whole table
+    def statistics(self, percentiles=PERCENTILES):
+        return cohort_statistics(compress(self.total_marks, self.live), self.boundaries, self.max_marks, percentiles)
+
+    # Reorder the table in place, with the same arguments as list.sort
+    def sort(self, key=None, reverse=False):
+        rows = [view.row for view in self]
+        if key is not None:
+            rows.sort(key=lambda row: key(StudentView(self, row)), reverse=reverse)
+        elif reverse:
+            rows.reverse()
+        self.compact(rows)
+
+    # Rewrite the columns keeping only the given rows (all live rows by default) in that order
+    def compact(self, rows=None):
+        if rows is None:
+            rows = [view.row for view in self]
+        names = [self.get_name(row) for row in rows]
+        for column in self.columns():
+            column[:] = array(column.typecode, [column[row] for row in rows])
+        self.live = bytearray(b'\x01') * len(rows)
+        self.deleted_rows = array('q')
+        self.row_of = RowMap(self.student_numbers, len(rows))
+        self.name_rows = None  # Every row has a new number, the name index is sorted again when next needed
+        # Rebuild the name buffer so it only holds the names still in use
+        self.name_data = bytearray()
+        for row, name in enumerate(names):
+            self.set_name(row, name)
+
+
+# Number of parsed rows handed out at a time by the streaming loader
+BATCH_SIZE = 10000
+
+
+# Function to parse one line of the marks file into its fields
+def parse_student_line(line):
+    parts = line.strip().split(',')  # Split the line into parts
+    if len(parts) != 6:
+        raise ValueError(f"expected 6 fields but found {len(parts)}")
+    student_number = int(parts[0])  # First part: student number
+    name = parts[1]  # Second part: student's name
+    coursework_marks = [int(mark) for mark in parts[2:5]]  # Next three parts: coursework marks
+    exam_mark = int(parts[5])  # Last part: exam mark
+    check_student_fields(student_number, coursework_marks, exam_mark)  # Must fit the table's typed columns
+    return student_number, name, coursework_marks, exam_mark
+
+
+# Shortest line a student can take in a marks file, e.g. "1,A,0,0,0,0"
+MIN_LINE_LENGTH = 12
+
+
+# Function to read the student count from the first line of an open marks file
+def read_student_count(file, bad_rows):
+    header = file.readline()
+    try:
+        # A header can claim more students than the file has room for, never trust it further than that
+        return min(max(int(header.strip()), 0), os.fstat(file.fileno()).st_size // MIN_LINE_LENGTH)
+    except ValueError:
+        # A broken header only costs us the preallocation, the rows can still be read
+        bad_rows.append(f"Line 1: invalid student count {header.strip()!r}")
+        return 0
+
+
+# Generator that streams parsed rows from an open marks file in fixed-size batches
+def iter_student_batches(file, batch_size=BATCH_SIZE, bad_rows=None, first_line=2):
+    batch = []  # Rows collected for the current batch
+    for line_number, line in enumerate(file, start=first_line):
+        if not line.strip():
+            continue  # Ignore blank lines such as a trailing newline
+        try:
+            batch.append(parse_student_line(line))
+        except ValueError as e:
+            # Record the bad row and carry on instead of abandoning the whole file
+            if bad_rows is not None:
+                bad_rows.append(f"Line {line_number}: {e}")
+            continue
+        if len(batch) == batch_size:
+            yield batch
+            batch = []  # Start a fresh batch so memory stays flat
+    if batch:
+        yield batch  # Hand out whatever is left over
+
+
+# Function to read a marks file into a table, collecting the reason for every skipped row
+# and calling progress(loaded, expected) after each batch if it is given
+@timed('student_read_seconds')
+def read_student_data(filename, students, bad_rows, progress=None):
+    skipped = len(bad_rows)  # Rows already reported before this file
+    with open(filename, 'r', encoding='utf-8') as file:
+        # First line should contain the number of students
+        expected = read_student_count(file, bad_rows)
+        students.reserve(expected)  # Preallocate the index for the students the header promises
+        # Process the remaining lines batch by batch straight into the table columns
+        for batch in iter_student_batches(file, bad_rows=bad_rows):
+            students.extend(batch, bad_rows)  # Duplicate student numbers are skipped too
+            if progress is not None:
+                progress(len(students), expected)
+    count('student_bad_rows_total', len(bad_rows) - skipped)
+    return students
+
+
+# Function to tell the user which rows of a file were skipped, listing only the first few
+def report_bad_rows(filename, bad_rows):
+    if bad_rows:
+        details = "\n".join(bad_rows[:10])
+        messagebox.showwarning("Warning", f"Skipped {len(bad_rows)} invalid row(s) in {filename}:\n{details}")
+
+
 # Function to load student data from a specified file
+@timed('student_load_seconds')
 def load_student_data(filename):
-    students = []  # Create an empty list to store student instances
+    students = StudentTable()  # Columnar table that receives the student records
+    bad_rows = []  # Reason for every row that was skipped
     try:
-        with open(filename, 'r') as file:
-            # First line should contain the number of students
-            num_students = int(file.readline().strip())  # Read the first line for the count
-            # Process each subsequent line to read student records
-            for line in file:
-                parts = line.strip().split(',')  # Split the line into parts
-                student_number = int(parts[0])  # First part: student number
-                name = parts[1]  # Second part: student's name
-                coursework_marks = list(map(int, parts[2:5]))  # Next three parts: coursework marks
-                exam_mark = int(parts[5])  # Last part: exam mark
-
-                # Create a new Student object and append it to the list
-                students.append(Student(student_number, name, coursework_marks, exam_mark))
+        read_student_data(filename, students, bad_rows)
     except FileNotFoundError:
         # Handle the case where the specified file does not exist
         messagebox.showerror("Error", f"File {filename} not found!")  # Notify the user of the error
     except Exception as e:
         # Catch any other exceptions and show an error message
         messagebox.showerror("Error", f"An error occurred while loading student data: {e}")
-    
-    return students  # Return the list of students loaded from the file
+
+    report_bad_rows(filename, bad_rows)
+    return students  # Return the table of students loaded from the file
+
+
+# Function to write a table out in the marks file format, replacing the file in one step.
+# Any kept_lines (rows that could not be loaded) are written back unchanged after the students.
+def save_student_data(students, filename, durable=True, kept_lines=()):
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'w', encoding='utf-8') as file:
+        file.write(f"{len(students) + len(kept_lines)}\n")  # First line holds the number of rows
+        for student in students:
+            file.write(f"{student.student_number},{student.name},"
+                       f"{','.join(map(str, student.coursework_marks))},{student.exam_mark}\n")
+        for line in kept_lines:
+            file.write(f"{line}\n")
+        if durable:
+            file.flush()
+            os.fsync(file.fileno())  # Make sure the data is on disk before it replaces the old file
+    os.replace(temp_filename, filename)
+
+
+# Function to read a marks file that is about to be rewritten into a table, returning the text of every
+# row that was skipped so the rewrite can keep it: a row the loader cannot take is for the user to fix,
+# not something to lose the first time the file is saved
+def read_snapshot(filename, students, bad_rows):
+    kept_lines = []
+    with open(filename, 'r', encoding='utf-8') as file:
+        file.readline()  # The count header, which is rewritten anyway
+        for line_number, line in enumerate(file, start=2):
+            if not line.strip():
+                continue  # Ignore blank lines such as a trailing newline
+            try:
+                students.add(*parse_student_line(line))
+            except ValueError as e:
+                bad_rows.append(f"Line {line_number}: {e}")
+                kept_lines.append(line.rstrip('\r\n'))
+    return kept_lines
+
+
+# How often StudentStore forces its change log to disk: after every change, every few changes, or never
+DURABILITY_LEVELS = ('always', 'batch', 'none')
+
+
+# Persistent student storage: a snapshot in the marks file format plus an append-only log of changes
+class StudentStore:
+    def __init__(self, filename, durability='batch', sync_every=100, compact_after=10000, progress=None):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"durability must be one of {DURABILITY_LEVELS}")
+        self.filename = filename  # The snapshot, e.g. studentMarks.txt
+        self.log_filename = filename + '.log'  # Changes made since the snapshot
+        self.old_log_filename = filename + '.log.old'  # Changes being folded into the snapshot
+        self.durability = durability
+        self.sync_every = sync_every  # Changes between syncs for 'batch' durability
+        self.compact_after = compact_after  # Logged changes that trigger a background compaction
+        self.unsynced = 0  # Changes written since the last sync
+        self.logged = 0  # Changes in the current log
+        self.compactor = None  # Background compaction thread, if one is running
+        self.bad_rows = []  # Rows of the snapshot that could not be loaded
+
+        # Recover: load the snapshot, then replay any logs on top of it
+        self.table = StudentTable()
+        if os.path.exists(filename):
+            read_student_data(filename, self.table, self.bad_rows, progress)
+        if os.path.exists(self.old_log_filename):
+            replay_change_log(self.table, self.old_log_filename, self.bad_rows)
+        if os.path.exists(self.log_filename):
+            self.logged = replay_change_log(self.table, self.log_filename, self.bad_rows)
+        self.log = open(self.log_filename, 'a', encoding='utf-8')
+        if os.path.exists(self.old_log_filename):
+            self.start_compaction()  # Finish a compaction that was interrupted
+
+    # Add a student and log the change
+    def add(self, student_number, name, coursework_marks, exam_mark):
+        check_name(name)
+        self.table.add(student_number, name, coursework_marks, exam_mark)
+        self.write_change('A', student_number, name, *coursework_marks, exam_mark)
+
+    # Update a student and log the change
+    def update(self, student_number, name, coursework_marks, exam_mark):
+        check_name(name)
+        self.table.update(student_number, name, coursework_marks, exam_mark)
+        self.write_change('U', student_number, name, *coursework_marks, exam_mark)
+
+    # Delete a student and log the change
+    def delete(self, student_number):
+        self.table.delete(student_number)
+        self.write_change('D', student_number)
+
+    # Append one change to the log, syncing and compacting as configured
+    def write_change(self, *fields):
+        self.log.write(",".join(map(str, fields)) + "\n")
+        self.unsynced += 1
+        self.logged += 1
+        if self.durability == 'always' or (self.durability == 'batch' and self.unsynced >= self.sync_every):
+            self.sync()
+        if self.logged >= self.compact_after:
+            self.start_compaction()
+
+    # Force everything logged so far onto disk
+    def sync(self):
+        self.log.flush()
+        if self.durability != 'none':
+            os.fsync(self.log.fileno())
+        self.unsynced = 0
+
+    # Fold the log into a new snapshot on a background thread
+    def start_compaction(self):
+        if self.compactor is not None and self.compactor.is_alive():
+            return  # One compaction at a time
+        if not os.path.exists(self.old_log_filename):
+            # Set the current log aside and start a fresh one for new changes
+            self.sync()
+            self.log.close()
+            os.replace(self.log_filename, self.old_log_filename)
+            self.log = open(self.log_filename, 'a', encoding='utf-8')
+            self.logged = 0
+        self.compactor = threading.Thread(target=metrics.profile_call,
+                                          args=(compact_snapshot, self.filename, self.old_log_filename,
+                                                self.durability != 'none'))
+        self.compactor.start()
+
+    # Replace the contents of the store with a marks file
+    def import_file(self, filename):
+        students = StudentTable()
+        kept_lines = read_snapshot(filename, students, self.bad_rows)
+        self.wait_for_compaction()
+        save_student_data(students, self.filename, self.durability != 'none', kept_lines)
+        self.log.close()
+        self.log = open(self.log_filename, 'w', encoding='utf-8')  # The new snapshot already holds everything
+        self.logged = 0
+        self.unsynced = 0
+        self.table = students
+
+    # Write the current records out in the marks file format
+    def export_file(self, filename):
+        save_student_data(self.table, filename, self.durability != 'none')
+
+    # Wait for a running compaction to finish
+    def wait_for_compaction(self):
+        if self.compactor is not None:
+            self.compactor.join()
+            self.compactor = None
+
+    # Flush the log and wait for background work before the app exits
+    def close(self):
+        self.wait_for_compaction()
+        self.sync()
+        self.log.close()
+
+
+# Function to reject names that would break the comma separated file format
+def check_name(name):
+    if not name or ',' in name or '\n' in name:
+        raise ValueError("names must not be empty or contain commas or newlines")
+
+
+# Function to apply a change log to a table, returning how many changes it held
+def replay_change_log(students, log_filename, bad_rows=None):
+    changes = 0
+    end_of_last_change = 0  # Byte offset just after the last complete line
+    with open(log_filename, 'rb') as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.endswith(b'\n'):
+                break  # A change that was cut off by a crash is ignored
+            end_of_last_change += len(line)
+            changes += 1
+            try:
+                replay_change(students, line.decode('utf-8').rstrip('\n'))
+            except ValueError as e:
+                # Skip the change and carry on with the rest of the log, as the loader does with bad rows
+                if bad_rows is not None:
+                    bad_rows.append(f"Line {line_number} of {os.path.basename(log_filename)}: {e}")
+    # Cut off any partial change so new ones are not appended to it
+    if end_of_last_change != os.path.getsize(log_filename):
+        os.truncate(log_filename, end_of_last_change)
+    return changes
+
+
+# Function to apply one line of a change log to a table
+def replay_change(students, change):
+    op, _, fields = change.partition(',')
+    if op == 'D':
+        student_number = int(fields)
+        if student_number in students:  # Replaying a log twice must be harmless
+            students.delete(student_number)
+    elif op in ('A', 'U'):
+        student_number, name, coursework_marks, exam_mark = parse_student_line(fields)
+        if student_number in students:
+            students.update(student_number, name, coursework_marks, exam_mark)
+        else:
+            students.add(student_number, name, coursework_marks, exam_mark)
+    else:
+        raise ValueError(f"unknown change {op!r}")
+
+
+# Function run in the background to fold a log into the snapshot and then remove it
+def compact_snapshot(filename, log_filename, durable):
+    students = StudentTable()
+    kept_lines = read_snapshot(filename, students, []) if os.path.exists(filename) else []
+    replay_change_log(students, log_filename)
+    save_student_data(students, filename, durable, kept_lines)
+    os.remove(log_filename)  # Only once the new snapshot is safely in place
+
+
+# Base for widgets that only hold the visible window of a long list of items
+class VirtualView:
+    def __init__(self, parent, widget, **widget_options):
+        self.frame = tk.Frame(parent)  # Holds the widget and its scrollbar
+        self.widget = widget(self.frame, **widget_options)
+        self.scrollbar = tk.Scrollbar(self.frame, command=self.scroll)
+        self.widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.count = 0  # Number of items in the list
+        self.fetch = None  # Function that produces the item at a position
+        self.first = 0  # Position of the first visible item
+
+        # Scroll by items with the mouse wheel instead of scrolling the widget's own contents
+        self.widget.bind("<MouseWheel>", lambda event: self.scroll('scroll', -1 if event.delta > 0 else 1, 'units'))
+        self.widget.bind("<Button-4>", lambda event: self.scroll('scroll', -1, 'units'))
+        self.widget.bind("<Button-5>", lambda event: self.scroll('scroll', 1, 'units'))
+
+    # Pack the frame holding the widget and its scrollbar
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    # How many items fit in the widget at once
+    def visible_items(self):
+        return 1
+
+    # Point the view at a new list of items and show the top of it
+    def set_items(self, count, fetch):
+        self.count = count
+        self.fetch = fetch
+        self.first = 0
+        self.render()
+
+    # Handle the scrollbar and mouse wheel, using the same arguments Tk passes to yview
+    def scroll(self, action, amount, unit=None):
+        visible = self.visible_items()
+        if action == 'moveto':
+            first = int(float(amount) * self.count)
+        elif unit == 'pages':
+            first = self.first + int(amount) * visible
+        else:
+            first = self.first + int(amount)
+        first = max(0, min(first, self.last_first()))
+        if first != self.first:
+            self.first = first
+            self.render()
+        return "break"  # Stop the widget scrolling its own contents
+
+    # The furthest the view can scroll, so the last item sits at the bottom
+    def last_first(self):
+        return self.count - self.visible_items()
+
+    # The positions of the items that are currently visible
+    def visible_range(self):
+        return range(self.first, min(self.first + self.visible_items(), self.count))
+
+    # Redraw the visible window, implemented by each kind of view
+    def render(self):
+        raise NotImplementedError
+
+    # Move the scrollbar slider to match the visible window
+    def update_scrollbar(self):
+        if self.count:
+            self.scrollbar.set(self.first / self.count, min((self.first + self.visible_items()) / self.count, 1))
+        else:
+            self.scrollbar.set(0, 1)
+
+
+# Text view that formats only the records currently on screen
+class VirtualTextView(VirtualView):
+    def __init__(self, parent, lines_per_item, **text_options):
+        super().__init__(parent, tk.Text, **text_options)
+        self.lines_per_item = lines_per_item  # Height of one formatted item
+        self.footer = ""  # Text shown after the last item
+
+    # Records that fit in the text box, counting a partly visible one at the bottom
+    def visible_items(self):
+        return int(self.widget.cget('height')) // self.lines_per_item + 1
+
+    # Leave room below the last record for the footer
+    def last_first(self):
+        return self.count - self.visible_items() + 1
+
+    # Show a list of items with a footer after the last one
+    def set_items(self, count, fetch, footer=""):
+        self.footer = footer
+        super().set_items(count, fetch)
+
+    # Replace the list with a single piece of text
+    def show_text(self, text):
+        self.count = 0
+        self.footer = text
+        self.render()
+
+    def render(self):
+        parts = [self.fetch(i) for i in self.visible_range()]  # Only the visible records are formatted
+        if self.first + self.visible_items() >= self.count:
+            parts.append(self.footer)  # The footer follows the last record
+        self.widget.delete(1.0, tk.END)
+        self.widget.insert(tk.END, "".join(parts))
+        self.update_scrollbar()
+
+
+# Listbox that only holds the entries currently on screen
+class VirtualListbox(VirtualView):
+    def __init__(self, parent, **listbox_options):
+        super().__init__(parent, tk.Listbox, **listbox_options)
+        self.values = []  # Value behind each visible entry
+
+    def visible_items(self):
+        return int(self.widget.cget('height'))
+
+    # Value behind the selected entry, fetch returns a (label, value) pair for each position, or None if nothing is selected
+    def selected_value(self):
+        selected_index = self.widget.curselection()
+        return self.values[selected_index[0]] if selected_index else None
+
+    def render(self):
+        entries = [self.fetch(i) for i in self.visible_range()]
+        self.values = [value for label, value in entries]
+        self.widget.delete(0, tk.END)
+        self.widget.insert(tk.END, *(label for label, value in entries))
+        self.update_scrollbar()
 
 
 # Main application class for the student records system
@@ -75,17 +1114,29 @@ class StudentApp:
         self.root.geometry('700x600')  # Define the size of the window
         self.root.config(bg="#f5f5f5")  # Set a light background color for the window
 
-        # Load student data from the text file into the application
-        self.students = load_student_data('studentMarks.txt')
+        # Slow work runs on a worker pool so the window stays responsive
+        self.tasks = BackgroundTasks(self.root)
+        self.current_task = None  # Background task that can be cancelled, if one is running
+        self.busy = False  # Whether background work is reading the table, which must not change meanwhile
+        self.status_message = ""  # What the background work is doing
+        self.store = None  # Student storage, set once loading has finished
+        self.students = StudentTable()  # Empty until the store has loaded
+        self.root.protocol("WM_DELETE_WINDOW", self.close)  # Flush the change log when the window closes
 
         # Track the windows and widgets that will be used in the app
         self.select_window = None  # For selecting individual students
         self.student_listbox = None  # Listbox for displaying students
+        self.sort_criteria = None  # Criteria chosen in sort_records, None keeps the order students were added
         self.select_button = None  # Button for selecting a student
 
         # Set up the layout of the application interface
         self.create_layout()
 
+    # Method called once the window is showing, the student data is only read from then on
+    def start(self, filename='studentMarks.txt'):
+        # Load student data from the text file and its change log in the background
+        self.load_data(filename)
+
     # Method to create the main layout of the application
     def create_layout(self):
         # Create and pack a title label at the top of the window
@@ -115,43 +1166,112 @@ class StudentApp:
         self.update_button = tk.Button(self.button_frame, text="Update Student", command=self.update_student, width=25, height=2)
         self.update_button.grid(row=2, column=1, padx=10, pady=5)
 
-        # Create a scrollable text box to display student records
-        self.text_box = scrolledtext.ScrolledText(self.root, width=80, height=20, wrap=tk.WORD, font=("Helvetica", 12))
+        # Buttons that are disabled while background work is running
+        self.action_buttons = [self.view_all_button, self.view_individual_button, self.sort_button,
+                               self.add_button, self.delete_button, self.update_button]
+
+        # Create a status line showing the progress of background work, with a button to cancel it
+        self.status_frame = tk.Frame(self.root, bg="#f5f5f5")
+        self.status_frame.pack()
+        self.status_label = tk.Label(self.status_frame, text="", font=("Helvetica", 11), bg="#f5f5f5")
+        self.status_label.pack(side=tk.LEFT, padx=10)
+        self.cancel_button = tk.Button(self.status_frame, text="Cancel", command=self.cancel_task, state='disabled')
+        self.cancel_button.pack(side=tk.LEFT)
+
+        # Create a scrollable text box to display student records, only the records on screen are ever rendered
+        self.text_box = VirtualTextView(self.root, lines_per_item=6, width=80, height=20, wrap=tk.WORD, font=("Helvetica", 12))
         self.text_box.pack(pady=10)  # Add padding for aesthetics
 
-    # Function to display all student records in the text box
-    def view_all_students(self):
-        self.text_box.delete(1.0, tk.END)  # Clear the text box to prepare for new content
-        total_percentage = 0  # Initialize total percentage for calculating the average
-        result = ""  # Prepare a result string to accumulate student information
+    # Function to load the student store on a worker thread
+    def load_data(self, filename):
+        self.set_busy("Loading student records...")
+        self.tasks.submit(lambda task: StudentStore(filename, progress=task.report_progress),
+                          on_done=self.data_loaded, on_error=self.load_failed, on_progress=self.show_progress)
+
+    # Function called on the Tk thread once the store has loaded
+    def data_loaded(self, store):
+        self.store = store
+        self.students = store.table
+        self.set_idle()
+        report_bad_rows(store.filename, store.bad_rows)
+
+    # Function called on the Tk thread if loading failed
+    def load_failed(self, error):
+        self.status_label.config(text="Student records could not be loaded.")
+        messagebox.showerror("Error", f"An error occurred while loading student data: {error}")
 
-        # Loop through each student and gather their information
-        for student in self.students:
-            result += student.display()  # Append each student's display information
-            total_percentage += student.percentage  # Add this student's percentage to the total
+    # Function to show how far the background work has got
+    def show_progress(self, done, total):
+        amount = f"{done * 100 // total}%" if total else f"{done} done"
+        self.status_label.config(text=f"{self.status_message} {amount}")
 
-        # Calculate and display the average percentage across all students
-        average_percentage = total_percentage / len(self.students) if self.students else 0  # Avoid division by zero
-        result += f"Total students: {len(self.students)}\n"
-        result += f"Average percentage: {average_percentage:.2f}%\n"
-        self.text_box.insert(tk.END, result)  # Insert the result into the text box
+    # Function to disable the buttons and show a message while background work runs
+    def set_busy(self, message, task=None):
+        self.current_task = task
+        self.busy = True
+        self.status_message = message  # Progress is shown after this message
+        self.set_buttons_state('disabled')
+        self.status_label.config(text=message)
+        self.cancel_button.config(state='normal' if task else 'disabled')
+
+    # Function to re-enable the buttons once background work is over
+    def set_idle(self, message=""):
+        self.current_task = None
+        self.busy = False
+        self.set_buttons_state('normal')
+        self.status_label.config(text=message)
+        self.cancel_button.config(state='disabled')
+
+    # Function to enable or disable every button that changes or reads the table, including the one in an
+    # open selection window, which could otherwise delete a student from under an order being built
+    def set_buttons_state(self, state):
+        for button in self.action_buttons:
+            button.config(state=state)
+        if self.select_window is not None and self.select_window.winfo_exists():
+            self.select_button.config(state=state)
+
+    # Function to cancel the running background task
+    def cancel_task(self):
+        if self.current_task is not None:
+            self.current_task.cancel()
+
+    # Function to display all student records in the text box
+    @timed('student_view_all_seconds')
+    def view_all_students(self):
+        # The totals come from the table's running aggregate rather than a pass over every student
+        footer = (f"Total students: {len(self.students)}\n"
+                  f"Average percentage: {self.students.average_percentage():.2f}%\n")
+        # Each record is formatted only when it scrolls into view, in the chosen sort order if there is one
+        self.text_box.set_items(len(self.students), lambda i: self.students.at(i, self.sort_criteria).display(), footer)
 
     # Function to sort student records based on user-defined criteria
     def sort_records(self):
-        sort_choice = simpledialog.askstring("Sort Records", "Enter sort criteria (name, marks, grade):")  # Ask user for sort criteria
-
-        # Sort the student list based on the criteria provided
-        if sort_choice == "name":
-            self.students.sort(key=lambda s: s.name)  # Sort alphabetically by name
-        elif sort_choice == "marks":
-            self.students.sort(key=lambda s: s.total_marks, reverse=True)  # Sort by total marks (highest first)
-        elif sort_choice == "grade":
-            self.students.sort(key=lambda s: s.grade)  # Sort by grade
-        else:
+        sort_choice = simpledialog.askstring("Sort Records", "Enter sort criteria (name, marks, grade), separated by commas:")  # Ask user for sort criteria
+
+        # Several criteria can be given separated by commas, e.g. "grade, name"
+        criteria = tuple(part.strip() for part in (sort_choice or "").split(','))
+        if not all(criterion in ('name', 'marks', 'grade') for criterion in criteria):
             # Show error if the criteria entered is invalid
             messagebox.showerror("Error", "Invalid sort criteria")
             return
 
+        # The first sort by some criteria is built in the background, after that the table
+        # keeps the order up to date as students are added, updated and deleted
+        def build_order(task):
+            with timer('student_sort_seconds'):  # Timed here, on the worker, where the sorting happens
+                return self.students.order(criteria, task.report_progress)
+
+        task = self.tasks.submit(build_order,
+                                 on_done=lambda order: self.sorted_records(criteria),
+                                 on_error=lambda error: self.set_idle(f"Sorting failed: {error}"),
+                                 on_cancelled=lambda: self.set_idle("Sorting cancelled."),
+                                 on_progress=self.show_progress)
+        self.set_busy("Sorting records...", task)
+
+    # Function called on the Tk thread once a sort order is ready
+    def sorted_records(self, criteria):
+        self.sort_criteria = criteria
+        self.set_idle()
         # Refresh the display after sorting
         self.view_all_students()
 
@@ -160,6 +1280,10 @@ class StudentApp:
         try:
             # Prompt user for student details
             student_number = int(simpledialog.askstring("Input", "Enter student number:"))  # Get student number
+            if student_number in self.students:
+                # Student numbers are unique, refuse to add a second record with the same one
+                messagebox.showerror("Error", f"Student number {student_number} already exists.")
+                return
             name = simpledialog.askstring("Input", "Enter student name:")  # Get student's name
             coursework_marks = [
                 int(simpledialog.askstring("Input", f"Enter coursework mark {i+1}:"))  # Get each coursework mark
@@ -167,9 +1291,8 @@ class StudentApp:
             ]
             exam_mark = int(simpledialog.askstring("Input", "Enter exam mark:"))  # Get exam mark
 
-            # Create a new Student object and add it to the list
-            new_student = Student(student_number, name, coursework_marks, exam_mark)
-            self.students.append(new_student)  # Append the new student to the list
+            # Add the new student to the store, which also logs the change
+            self.store.add(student_number, name, coursework_marks, exam_mark)
             messagebox.showinfo("Success", "Student record added successfully!")  # Notify the user of success
             self.view_all_students()  # Refresh the display to show the new student
         except ValueError:
@@ -184,12 +1307,11 @@ class StudentApp:
 
     # Function to confirm the deletion of a selected student
     def confirm_delete_student(self):
-        selected_index = self.student_listbox.curselection()  # Get the index of the selected student
-        if selected_index:
-            student = self.students[selected_index[0]]  # Retrieve the selected student
+        student = self.selected_student()  # Retrieve the selected student
+        if student:
             # Ask for confirmation before deleting the record
             if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {student.name}'s record?"):
-                del self.students[selected_index[0]]  # Remove the student from the list
+                self.store.delete(student.student_number)  # Remove the student and log the change
                 self.select_window.destroy()  # Close the selection window
                 messagebox.showinfo("Success", "Student record deleted.")  # Notify the user
                 self.view_all_students()  # Refresh the student records display
@@ -202,24 +1324,22 @@ class StudentApp:
 
     # Function to confirm and update the selected student's record
     def confirm_update_student(self):
-        selected_index = self.student_listbox.curselection()  # Get the index of the selected student
-        if selected_index:
-            student = self.students[selected_index[0]]  # Retrieve the selected student
+        student = self.selected_student()  # Retrieve the selected student
+        if student:
 
             try:
                 # Prompt the user to input updated details for the selected student
-                student.name = simpledialog.askstring("Input", f"Enter new name for {student.name}:")  # Update name
-                student.coursework_marks = [
-                    int(simpledialog.askstring("Input", f"Enter new coursework mark {i+1} for {student.name}:"))  # Update each coursework mark
+                name = simpledialog.askstring("Input", f"Enter new name for {student.name}:")  # New name
+                if not name:
+                    raise ValueError("a name is required")
+                coursework_marks = [
+                    int(simpledialog.askstring("Input", f"Enter new coursework mark {i+1} for {name}:"))  # New coursework marks
                     for i in range(3)
                 ]
-                student.exam_mark = int(simpledialog.askstring("Input", f"Enter new exam mark for {student.name}:"))  # Update exam mark
+                exam_mark = int(simpledialog.askstring("Input", f"Enter new exam mark for {name}:"))  # New exam mark
 
-                # Recalculate the student's total marks, percentage, and grade
-                student.total_coursework = sum(student.coursework_marks)  # Update coursework total
-                student.total_marks = student.total_coursework + student.exam_mark  # Update overall total marks
-                student.percentage = (student.total_marks / 160) * 100  # Recalculate percentage
-                student.grade = student.calculate_grade()  # Recalculate grade
+                # Store the new details, the table recalculates total marks, percentage and grade
+                self.store.update(student.student_number, name, coursework_marks, exam_mark)
 
                 self.select_window.destroy()  # Close the selection window after updating
                 messagebox.showinfo("Success", "Student record updated.")  # Notify the user
@@ -235,26 +1355,193 @@ class StudentApp:
         self.select_window.geometry('300x400')  # Set the size of the window
 
         # Create a listbox to display the names of all students
-        self.student_listbox = tk.Listbox(self.select_window, font=("Helvetica", 12))  # Configure the listbox appearance
-        for student in self.students:
-            self.student_listbox.insert(tk.END, student.name)  # Add each student's name to the listbox
+        self.student_listbox = VirtualListbox(self.select_window, font=("Helvetica", 12))  # Configure the listbox appearance
+        # Only the names on screen are put in the listbox, each remembering its student number
+        self.student_listbox.set_items(len(self.students), self.list_entry)
         self.student_listbox.pack(pady=20)  # Pack the listbox with some padding
 
         # Add a button to view the selected student's record
-        self.select_button = tk.Button(self.select_window, text="View Record", command=self.show_individual_record)  # Set up the button
+        self.select_button = tk.Button(self.select_window, text="View Record", command=self.show_individual_record,
+                                       state='disabled' if self.busy else 'normal')  # Set up the button
         self.select_button.pack(pady=10)  # Add padding for aesthetics
 
+    # Function to save outstanding changes and close the application
+    def close(self):
+        self.cancel_task()
+        self.tasks.shutdown()
+        if self.store is not None:
+            self.store.close()
+        self.root.destroy()
+
+    # Function to look up the student selected in the listbox, or None if nothing is selected
+    def selected_student(self):
+        student_number = self.student_listbox.selected_value()  # Get the number of the selected student
+        if student_number is None:
+            return None
+        return self.students.get(student_number)  # Find them by student number
+
+    # Function to produce the listbox entry for a position, in the same order as the records view
+    def list_entry(self, index):
+        student = self.students.at(index, self.sort_criteria)
+        return student.name, student.student_number
+
     # Function to display the selected student's record
     def show_individual_record(self):
-        selected_index = self.student_listbox.curselection()  # Get the index of the selected student
-        if selected_index:
-            student = self.students[selected_index[0]]  # Retrieve the selected student
-            self.text_box.delete(1.0, tk.END)  # Clear the text box
-            self.text_box.insert(tk.END, student.display())  # Insert the student's details into the text box
+        student = self.selected_student()  # Retrieve the selected student
+        if student:
+            self.text_box.show_text(student.display())  # Show the student's details in the text box
+
+
+# Columns of the per-student batch grading report
+REPORT_FIELDS = ('file', 'student_number', 'name', 'total_coursework', 'exam_mark', 'total_marks', 'percentage', 'grade')
+# Smallest byte range worth handing to a worker process
+MIN_SHARD_SIZE = 1 << 20
+
+
+# Function run in a worker process: grade the rows of a marks file that start between the start and end byte
+# offsets, writing report rows to a part file and returning the counts needed for the cohort statistics
+def grade_shard(filename, start, end, part_filename, report_format, boundaries, max_marks):
+    total_counts = Counter()  # How many students got each total mark
+    bad_rows = []  # Reason for every row that was skipped
+    students = StudentTable(boundaries, max_marks)  # Only used for its grading lookup
+    with open(filename, 'rb') as file, open(part_filename, 'w', encoding='utf-8', newline='') as part:
+        writer = csv.writer(part)
+        # Skip the rest of the line the range starts in, it belongs to the previous shard
+        file.seek(start - 1)
+        file.readline()
+        position = file.tell()
+        while position < end:
+            line = file.readline()
+            if not line:
+                break
+            line_start = position
+            position += len(line)
+            if not line.strip():
+                continue  # Ignore blank lines such as a trailing newline
+            try:
+                student_number, name, coursework_marks, exam_mark = parse_student_line(line.decode('utf-8'))
+            except (ValueError, UnicodeDecodeError) as e:
+                bad_rows.append(f"{filename} byte {line_start}: {e}")
+                continue
+            total_coursework = sum(coursework_marks)
+            total_marks = total_coursework + exam_mark
+            total_counts[total_marks] += 1
+            row = (filename, student_number, name, total_coursework, exam_mark, total_marks,
+                   round((total_marks / max_marks) * 100, 2), GRADES[students.grade_code(total_marks)])
+            if report_format == 'json':
+                part.write(",\n" + json.dumps(dict(zip(REPORT_FIELDS, row))))
+            else:
+                writer.writerow(row)
+    return total_counts, bad_rows
+
+
+# Function to split the rows of a marks file into byte ranges for the worker processes
+def shard_ranges(filename, workers):
+    with open(filename, 'rb') as file:
+        data_start = len(file.readline())  # Rows start after the count header
+    size = os.path.getsize(filename)
+    shard_size = max((size - data_start) // (workers * 4) + 1, MIN_SHARD_SIZE)  # A few shards per worker
+    return [(start, min(start + shard_size, size)) for start in range(data_start, size, shard_size)]
+
+
+# Function to grade marks files without the GUI, used by the command line entry point
+def grade_files(filenames, output, report_format='csv', workers=None, boundaries=GRADE_BOUNDARIES, max_marks=MAX_MARKS):
+    workers = workers or os.cpu_count() or 1
+    file_counts = [Counter() for filename in filenames]  # Total mark counts per file, by position, as a file may be given twice
+    bad_rows = []
+    with tempfile.TemporaryDirectory() as part_dir:
+        # One job per byte range of every file, each writing its report rows to its own part file
+        jobs = []
+        for file_index, filename in enumerate(filenames):
+            for start, end in shard_ranges(filename, workers):
+                part_filename = os.path.join(part_dir, f"part{len(jobs)}")
+                jobs.append((file_index, (filename, start, end, part_filename, report_format, boundaries, max_marks)))
+        if workers == 1:
+            results = [grade_shard(*args) for file_index, args in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(grade_shard, *zip(*(args for file_index, args in jobs))))
+
+        # Merge the partial counts, in file order so skipped rows are reported in order
+        for (file_index, args), (total_counts, shard_bad_rows) in zip(jobs, results):
+            file_counts[file_index].update(total_counts)
+            bad_rows.extend(shard_bad_rows)
+        cohort_counts = sum(file_counts, Counter())
+        cohort = statistics_from_counts(cohort_counts, boundaries, max_marks)
+
+        # Stitch the part files together into the report
+        if report_format == 'json':
+            output.write('{"cohort": ' + json.dumps(cohort) + ',\n"files": ')
+            output.write(json.dumps([{'file': filename, **statistics_from_counts(counts, boundaries, max_marks)}
+                                     for filename, counts in zip(filenames, file_counts)]))
+            output.write(',\n"students": [')
+            first = True
+            for file_index, args in jobs:
+                with open(args[3], encoding='utf-8') as part:
+                    if first and part.read(1):
+                        part.read(1)  # The very first row has no comma before it
+                        first = False
+                    shutil.copyfileobj(part, output)
+            output.write('\n]}\n')
+        else:
+            writer = csv.writer(output)
+            writer.writerow(REPORT_FIELDS)
+            for file_index, args in jobs:
+                with open(args[3], encoding='utf-8', newline='') as part:
+                    shutil.copyfileobj(part, output)
+            # Cohort statistics follow the students after a blank line
+            writer.writerows([(), ('statistic', 'value'), ('count', cohort['count'])])
+            writer.writerows((key, round(cohort[key], 2)) for key in ('mean', 'median', 'stdev'))
+            writer.writerows((f"grade_{grade}", n) for grade, n in cohort['grades'].items())
+            writer.writerows((f"p{percentile}", round(value, 2)) for percentile, value in cohort['percentiles'].items())
+    return cohort, bad_rows
+
+
+# Command line entry point: grade marks files and write a report instead of opening the GUI
+def main(argv):
+    parser = argparse.ArgumentParser(description="Grade student marks files and write a CSV or JSON report.")
+    parser.add_argument('files', nargs='+', help="marks files in the studentMarks.txt format")
+    parser.add_argument('-o', '--output', help="report file to write (default: standard output)")
+    parser.add_argument('-f', '--format', choices=('csv', 'json'),
+                        help="report format (default: taken from the output file extension, otherwise csv)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument('--boundaries', default=",".join(map(str, GRADE_BOUNDARIES)),
+                        help="lowest percentages for A, B, C and D (default: %(default)s)")
+    parser.add_argument('--max-marks', type=int, default=MAX_MARKS, help="total marks available (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    report_format = args.format or ('json' if args.output and args.output.endswith('.json') else 'csv')
+    try:
+        boundaries = tuple(float(boundary) for boundary in args.boundaries.split(','))
+    except ValueError:
+        parser.error("--boundaries must be numbers separated by commas")
+    if len(boundaries) != len(GRADE_BOUNDARIES) or any(a <= b for a, b in zip(boundaries, boundaries[1:])):
+        parser.error(f"--boundaries must be {len(GRADE_BOUNDARIES)} percentages from highest to lowest, "
+                     f"one each for {', '.join(GRADES[:-1])}")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if not 1 <= args.max_marks <= MARK_LIMITS[1]:
+        # Totals are kept as 'h', and grading looks up every total up to max_marks in a table
+        parser.error(f"--max-marks must be between 1 and {MARK_LIMITS[1]}")
+    for filename in args.files:
+        if not os.path.isfile(filename):
+            print(f"Error: file {filename} not found!", file=sys.stderr)
+            return 1
+
+    output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        cohort, bad_rows = grade_files(args.files, output, report_format, args.workers, boundaries, args.max_marks)
+    finally:
+        if args.output:
+            output.close()
+    for reason in bad_rows:
+        print(f"Skipped invalid row: {reason}", file=sys.stderr)
+    print(f"Graded {cohort['count']} students, average percentage {cohort['mean']:.2f}%", file=sys.stderr)
+    return 0
 
 
 # Entry point for running the application
 if __name__ == "__main__":
-    root = tk.Tk()  # Create the main application window
-    app = StudentApp(root)  # Initialize the StudentApp with the root window
-    root.mainloop()  # Start the Tkinter event loop
+    if len(sys.argv) > 1:
+        sys.exit(main(sys.argv[1:]))  # Marks files were given, grade them headlessly
+    launch(StudentApp)  # Show the window, then load the student data
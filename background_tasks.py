@@ -0,0 +1,104 @@
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import metrics
+
+
+# Raised inside a work function when its task has been cancelled
+class TaskCancelled(Exception):
+    pass
+
+
+# One piece of work on the pool, handed to the work function so it can report progress and notice cancellation
+class Task:
+    def __init__(self, tasks, on_progress):
+        self.tasks = tasks  # The BackgroundTasks that runs this task
+        self.on_progress = on_progress  # Called on the Tk thread with (done, total)
+        self.cancel_event = threading.Event()  # Set when the task should stop
+
+    # Ask the task to stop, it does so the next time it reports progress
+    def cancel(self):
+        self.cancel_event.set()
+
+    # Whether the task has been asked to stop
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    # Called from the work function: posts progress to the Tk thread and stops the work if it was cancelled
+    def report_progress(self, done, total):
+        if self.cancelled:
+            raise TaskCancelled()
+        if self.on_progress is not None:
+            self.tasks.post(self.on_progress, done, total)
+
+
+# Worker pool that runs slow work off the Tk thread and hands the results back through root.after
+class BackgroundTasks:
+    POLL_MS = 50  # How often the Tk thread checks for finished work while tasks are running
+
+    def __init__(self, root, max_workers=2):
+        self.root = root  # The Tk root window, used to schedule callbacks on the Tk thread and report their errors
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.callbacks = queue.Queue()  # (callback, args) posted by the workers
+        self.running = 0  # Tasks submitted but not yet finished, only touched on the Tk thread
+        self.polling = False  # Whether a poll is scheduled
+
+    # Run work(task, *args) on the pool; on_done(result), on_error(exception) and on_progress(done, total)
+    # are called on the Tk thread, and on_cancelled() if the task was cancelled
+    def submit(self, work, *args, on_done=None, on_error=None, on_progress=None, on_cancelled=None):
+        task = Task(self, on_progress)
+        self.running += 1
+        self.executor.submit(self.run, task, work, args, on_done, on_error, on_cancelled)
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.POLL_MS, self.poll)
+        return task
+
+    # Runs on a worker thread
+    def run(self, task, work, args, on_done, on_error, on_cancelled):
+        try:
+            result = metrics.profile_call(work, task, *args)  # Seen by the profiler when profiling is on
+        except TaskCancelled:
+            self.post(on_cancelled)
+        except Exception as e:
+            self.post(on_error, e)
+        else:
+            # Work that finishes after a cancel without noticing it is still treated as cancelled
+            if task.cancelled:
+                self.post(on_cancelled)
+            else:
+                self.post(on_done, result)
+        finally:
+            self.post(self.finished)
+
+    # Queue a callback to be run on the Tk thread, safe to call from any thread
+    def post(self, callback, *args):
+        if callback is not None:
+            self.callbacks.put((callback, args))
+
+    # Runs on the Tk thread: bookkeeping once a task is over
+    def finished(self):
+        self.running -= 1
+
+    # Runs on the Tk thread: call everything the workers have posted, then check again later if work remains.
+    # A callback that raises is reported like any other Tk callback error, the rest still run.
+    def poll(self):
+        while True:
+            try:
+                callback, args = self.callbacks.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+        if self.running:
+            self.root.after(self.POLL_MS, self.poll)
+        else:
+            self.polling = False
+
+    # Stop accepting work, dropping anything that has not started yet
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,65 @@
+# Start-up time, pick latency and peak RSS of the memory-mapped joke corpus as the corpus grows
+#   python benchmarks/bench_corpus.py [--jokes 100000 1000000 10000000] [--old-up-to 1000000]
+import argparse
+import os
+import time
+from bench_util import cached_file, generate_joke_file, load_exercise, peak_rss_mb, print_table, run_isolated
+
+PICKS = 10000  # Random jokes fetched to time a pick
+
+
+# Runs in a fresh process: open the corpus with an up-to-date index and pick jokes from it
+def measure_corpus(filename):
+    jokes_module = load_exercise(2)
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    corpus = jokes_module.open_joke_corpus(filename)
+    opened = time.perf_counter() - started
+    open_rss = peak_rss_mb() - baseline
+    started = time.perf_counter()
+    for _ in range(PICKS):
+        corpus.random_joke()
+    pick = (time.perf_counter() - started) / PICKS
+    return opened, pick, open_rss, peak_rss_mb() - baseline
+
+
+# Runs in a fresh process: the old path, reading every joke into a list
+def measure_load_jokes(filename):
+    jokes_module = load_exercise(2)
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    jokes_module.load_jokes(filename)
+    return time.perf_counter() - started, peak_rss_mb() - baseline
+
+
+# Runs in a fresh process: build the index, which is only needed once per corpus
+def build_index(filename):
+    jokes_module = load_exercise(2)
+    started = time.perf_counter()
+    jokes_module.build_joke_index(filename, filename + '.idx')
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory-mapped joke corpus start-up and RSS against corpus size.")
+    parser.add_argument('--jokes', type=int, nargs='+', default=[10 ** 5, 10 ** 6, 10 ** 7])
+    parser.add_argument('--old-up-to', type=int, default=10 ** 6, help="largest corpus to time load_jokes on")
+    parser.add_argument('--data-dir', default=os.path.join(os.path.dirname(__file__), 'data'))
+    args = parser.parse_args()
+
+    results = []
+    for jokes in args.jokes:
+        filename = cached_file(args.data_dir, f"jokes-{jokes}.txt", generate_joke_file, jokes)
+        built = run_isolated(build_index, filename)
+        opened, pick, open_rss, rss = run_isolated(measure_corpus, filename)
+        old_seconds, old_rss = run_isolated(measure_load_jokes, filename) if jokes <= args.old_up_to else ("-", "-")
+        results.append((jokes, os.path.getsize(filename) / 2 ** 20, built, opened * 1000, pick * 1e6, open_rss, rss,
+                        old_seconds, old_rss))
+    # Picks fault in the mapped pages they touch; those are page cache the kernel can drop, not heap
+    print_table(("jokes", "corpus (MiB)", "index build (s)", "open (ms)", "pick (us)", "RSS open (MiB)",
+                 "RSS after picks (MiB)",
+                 "load_jokes (s)", "load_jokes RSS (MiB)"), results)
+
+
+if __name__ == "__main__":
+    main()
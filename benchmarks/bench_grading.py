@@ -0,0 +1,60 @@
+# Grading and cohort statistics in one batch pass against the per-Student path
+#   python benchmarks/bench_grading.py [--rows 1000000]
+import argparse
+import random
+import statistics
+import time
+from array import array
+from bench_util import load_exercise, print_table
+
+
+# The per-object path: a Student per row, then Python loops over them for every statistic
+def per_object(students_module, rows):
+    students = [students_module.Student(*row) for row in rows]
+    percentages = sorted(student.percentage for student in students)
+    grades = dict.fromkeys(students_module.GRADES, 0)
+    for student in students:
+        grades[student.grade] += 1
+    return {'count': len(students), 'mean': sum(percentages) / len(percentages),
+            'median': statistics.median(percentages), 'stdev': statistics.pstdev(percentages), 'grades': grades,
+            'percentiles': {p: percentages[max(-(-p * len(percentages) // 100) - 1, 0)]
+                            for p in students_module.PERCENTILES}}
+
+
+# The batch path: a column of totals graded and summarised by the module functions
+def batch(students_module, rows):
+    total_marks = array('h', (sum(coursework) + exam for number, name, coursework, exam in rows))
+    grade_codes = students_module.grade_cohort(total_marks)
+    return students_module.cohort_statistics(total_marks), grade_codes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch grading and statistics against the per-Student path.")
+    parser.add_argument('--rows', type=int, default=10 ** 6)
+    args = parser.parse_args()
+
+    students_module = load_exercise(3)
+    rng = random.Random(0)
+    rows = [(number, "Name", [rng.randint(0, 20) for _ in range(3)], rng.randint(0, 100))
+            for number in range(args.rows)]
+
+    started = time.perf_counter()
+    expected = per_object(students_module, rows)
+    per_object_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    stats, grade_codes = batch(students_module, rows)
+    batch_seconds = time.perf_counter() - started
+
+    # Both paths must agree before their timings mean anything
+    assert stats['grades'] == expected['grades'], (stats['grades'], expected['grades'])
+    for key in ('mean', 'median', 'stdev'):
+        assert abs(stats[key] - expected[key]) < 1e-6, (key, stats[key], expected[key])
+    assert stats['percentiles'] == expected['percentiles']
+    print_table(("path", "rows", "seconds", "rows/sec"),
+                [("per Student", args.rows, per_object_seconds, round(args.rows / per_object_seconds)),
+                 ("batch", args.rows, batch_seconds, round(args.rows / batch_seconds))])
+    print(f"batch is {per_object_seconds / batch_seconds:.1f}x faster, results match")
+
+
+if __name__ == "__main__":
+    main()
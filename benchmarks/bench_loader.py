@@ -0,0 +1,34 @@
+# Rows/sec and peak RSS of the streaming student loader on generated marks files
+#   python benchmarks/bench_loader.py [--rows 1000000 10000000] [--data-dir benchmarks/data]
+import argparse
+import os
+import time
+from bench_util import cached_file, generate_marks_file, load_exercise, peak_rss_mb, print_table, run_isolated
+
+
+# Runs in a fresh process: load a marks file into a StudentTable
+def measure(filename):
+    students_module = load_exercise(3)
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    students = students_module.read_student_data(filename, students_module.StudentTable(), [])
+    elapsed = time.perf_counter() - started
+    return len(students), elapsed, peak_rss_mb() - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rows/sec and peak RSS of the streaming student loader.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10 ** 6, 10 ** 7])
+    parser.add_argument('--data-dir', default=os.path.join(os.path.dirname(__file__), 'data'))
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        filename = cached_file(args.data_dir, f"marks-{rows}.txt", generate_marks_file, rows)
+        loaded, elapsed, rss = run_isolated(measure, filename)
+        results.append((rows, loaded, elapsed, round(loaded / elapsed), rss, os.path.getsize(filename) / 2 ** 20))
+    print_table(("rows", "loaded", "seconds", "rows/sec", "peak RSS over import (MiB)", "file (MiB)"), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Memory held by a list of Student objects against a StudentTable with the same students
+#   python benchmarks/bench_memory.py [--rows 1000000]
+import argparse
+import random
+import tracemalloc
+from bench_util import FIRST_NAMES, LAST_NAMES, load_exercise, print_table, run_isolated
+
+
+# Rows as parsed from a marks file, generated rather than read so only the stores are measured
+def generate_rows(rows, seed=0):
+    rng = random.Random(seed)
+    for student_number in range(1000, 1000 + rows):
+        yield (student_number, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+               [rng.randint(0, 20) for _ in range(3)], rng.randint(0, 100))
+
+
+# Runs in a fresh process: bytes allocated to hold the students in the given representation
+def measure(representation, rows):
+    students_module = load_exercise(3)
+    tracemalloc.start()
+    if representation == 'list of Student':
+        store = [students_module.Student(*row) for row in generate_rows(rows)]
+        detail = ""
+    else:
+        store = students_module.StudentTable()
+        for row in generate_rows(rows):
+            store.add(*row)
+        columns = sum(column.itemsize * len(column) for column in store.columns())
+        columns += len(store.name_data) + len(store.live)
+        detail = f"columns and names {columns / rows:.0f} B/row, the rest is the indexes"
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return allocated, detail
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory of a list of Student objects against a StudentTable.")
+    parser.add_argument('--rows', type=int, default=10 ** 6)
+    args = parser.parse_args()
+
+    results = []
+    for representation in ('list of Student', 'StudentTable'):
+        allocated, detail = run_isolated(measure, representation, args.rows)
+        results.append((representation, args.rows, allocated / 2 ** 20, round(allocated / args.rows), detail))
+    print_table(("representation", "rows", "MiB", "bytes/row", ""), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Questions/sec of the eval-based generator the quiz used to have against QuestionEngine
+#   python benchmarks/bench_questions.py [--questions 1000000]
+import argparse
+import random
+import time
+from bench_util import load_exercise, print_table
+
+
+# The old generate_question: random.randint per operand, then eval on the question text
+def generate_with_eval(level, ranges):
+    low, high = ranges[level]
+    num1 = random.randint(low, high)
+    num2 = random.randint(low, high)
+    operation = random.choice(['+', '-', '*', '/'])
+    if operation == '/':
+        num1 = num1 * num2
+    question = f"{num1} {operation} {num2}"
+    return question, eval(question)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quiz question generation with eval against QuestionEngine.")
+    parser.add_argument('--questions', type=int, default=10 ** 6, help="questions generated per level and path")
+    parser.add_argument('--batch-size', type=int, default=50, help="questions per generate_batch call")
+    args = parser.parse_args()
+
+    quiz_module = load_exercise(1)
+    engine = quiz_module.QuestionEngine(seed=0)
+    count = args.questions
+    paths = {
+        'eval': lambda level: [generate_with_eval(level, quiz_module.LEVEL_RANGES) for _ in range(count)],
+        'generate': lambda level: [engine.generate(level) for _ in range(count)],
+        'generate_batch': lambda level: [question for _ in range(0, count, args.batch_size)
+                                         for question in engine.generate_batch(level, args.batch_size)],
+    }
+
+    # The engine's answers must be the exact values eval gives, before its speed means anything
+    for question in engine.generate_batch('hard', 10000):
+        assert question.answer == eval(question.text), question
+
+    results = []
+    for level in quiz_module.LEVEL_RANGES:
+        baseline = None
+        for path, generate in paths.items():
+            started = time.perf_counter()
+            generate(level)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            results.append((level, path, elapsed, round(count / elapsed), f"{baseline / elapsed:.1f}x"))
+    print_table(("level", "path", "seconds", "questions/sec", "speedup"), results)
+
+
+if __name__ == "__main__":
+    main()
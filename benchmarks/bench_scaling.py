@@ -0,0 +1,44 @@
+# Throughput of the batch grading command line against the number of worker processes
+#   python benchmarks/bench_scaling.py [--rows 1000000] [--workers 1 2 4 8]
+import argparse
+import os
+import subprocess
+import sys
+import time
+from bench_util import EXERCISES, ROOT, cached_file, generate_marks_file, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch grading throughput against the number of workers.")
+    parser.add_argument('--rows', type=int, default=10 ** 6)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        help="worker counts to try (default: powers of two up to the number of cores)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per worker count, the fastest is kept")
+    parser.add_argument('--data-dir', default=os.path.join(os.path.dirname(__file__), 'data'))
+    args = parser.parse_args()
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    workers = args.workers or [1 << i for i in range(cores.bit_length()) if 1 << i <= cores]
+    script = os.path.join(ROOT, EXERCISES[3])
+    filename = cached_file(args.data_dir, f"marks-{args.rows}.txt", generate_marks_file, args.rows)
+
+    results = []
+    baseline = None
+    for count in workers:
+        best = None
+        for _ in range(args.repeat):
+            # The command line itself, start-up included, as it would be run on a server
+            started = time.perf_counter()
+            subprocess.run([sys.executable, script, filename, '-w', str(count), '-o', os.devnull],
+                           check=True, stderr=subprocess.DEVNULL)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        baseline = baseline or best * workers[0]  # Throughput of one worker, assuming the first count scales
+        results.append((count, best, round(args.rows / best), f"{baseline / best:.2f}x",
+                        f"{baseline / best / count:.0%}"))
+    print(f"{cores} core(s) available; speedup cannot go past that")
+    print_table(("workers", "seconds", "rows/sec", "speedup", "efficiency"), results)
+
+
+if __name__ == "__main__":
+    main()
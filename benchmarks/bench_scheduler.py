@@ -0,0 +1,93 @@
+# Cost of a pick and memory per client of JokeScheduler on a large corpus with many clients
+#   python benchmarks/bench_scheduler.py [--jokes 10000000] [--clients 100000]
+import argparse
+import random
+import time
+import tracemalloc
+from bench_util import load_exercise, print_table
+
+
+# Microseconds per pick over a number of picks
+def time_picks(scheduler, picks):
+    started = time.perf_counter()
+    for _ in range(picks):
+        scheduler.next_index()
+    return (time.perf_counter() - started) / picks * 1e6
+
+
+# Popularity with a given share of the jokes clicked, and the set of those jokes
+def clicked_popularity(jokes_module, jokes, share, seed=0):
+    popularity = jokes_module.JokePopularity(jokes)
+    popular = set(random.Random(seed).sample(range(jokes), int(jokes * share)))
+    for index in popular:
+        popularity.record(index)
+    return popularity, popular
+
+
+# Check that every joke comes up exactly once in each of the first cycles, with clicks still coming in
+def check_cycles(jokes_module, jokes, cycles=2):
+    popularity, popular = clicked_popularity(jokes_module, jokes, 0.01)
+    scheduler = jokes_module.JokeScheduler(jokes, seed=1, popularity=popularity)
+    rng = random.Random(1)
+    for cycle in range(cycles):
+        told = []
+        for _ in range(jokes):
+            told.append(scheduler.next_index())
+            if rng.random() < 0.05:
+                popularity.record(rng.randrange(jokes))  # Other clients clicking part way through the cycle
+        assert sorted(told) == list(range(jokes)), f"cycle {cycle} missed or repeated jokes"
+
+
+# Share of the first picks of a cycle that land on the clicked jokes, with and without weighting
+def popular_share(jokes_module, jokes, share, picks):
+    popularity, popular = clicked_popularity(jokes_module, jokes, share)
+    shares = []
+    for weights in (None, popularity):
+        scheduler = jokes_module.JokeScheduler(jokes, seed=2, popularity=weights)
+        shares.append(sum(scheduler.next_index() in popular for _ in range(picks)) / picks)
+    return shares
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JokeScheduler pick cost and memory per client.")
+    parser.add_argument('--jokes', type=int, default=10 ** 7)
+    parser.add_argument('--clients', type=int, default=10 ** 5)
+    parser.add_argument('--picks', type=int, default=10 ** 5, help="picks timed per scheduler")
+    parser.add_argument('--cycle-jokes', type=int, default=10 ** 5, help="corpus size for the full-cycle check")
+    args = parser.parse_args()
+
+    jokes_module = load_exercise(2)
+    check_cycles(jokes_module, args.cycle_jokes)
+    print(f"every joke told once per cycle while clicks come in ({args.cycle_jokes:,} jokes, 2 cycles)")
+    uniform, weighted = popular_share(jokes_module, args.cycle_jokes, 0.01, args.cycle_jokes // 10)
+    # Weighting has to actually move the clicked jokes forward, not just reorder a few picks
+    assert weighted > 2 * uniform, (uniform, weighted)
+    print(f"1% of jokes clicked: {uniform:.2%} of the first tenth of a cycle uniform, {weighted:.2%} weighted")
+    print()
+
+    # One popularity table shared by every client, with 1% of the jokes clicked
+    popularity, popular = clicked_popularity(jokes_module, args.jokes, 0.01)
+    picks = [("uniform", time_picks(jokes_module.JokeScheduler(args.jokes, seed=0), args.picks)),
+             ("weighted", time_picks(jokes_module.JokeScheduler(args.jokes, seed=0, popularity=popularity),
+                                     args.picks))]
+
+    # Memory for the clients' state alone, each part way through its cycle
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    clients = [jokes_module.JokeScheduler(args.jokes, popularity=popularity) for _ in range(args.clients)]
+    for scheduler in clients:
+        for _ in range(10):
+            scheduler.next_index()
+    per_client = (tracemalloc.get_traced_memory()[0] - before) / len(clients)
+    tracemalloc.stop()
+
+    print_table(("jokes", "path", "us per pick", "picks/sec"),
+                [(args.jokes, path, micros, round(1e6 / micros)) for path, micros in picks])
+    print()
+    print_table(("clients", "bytes per client", "all clients (MiB)", "shared popularity (MiB)"),
+                [(args.clients, round(per_client), per_client * args.clients / 2 ** 20,
+                  popularity.first_click.buffer_info()[1] * popularity.first_click.itemsize / 2 ** 20)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Build time, size and query latency of the joke search index on a multi-million joke corpus
+#   python benchmarks/bench_search.py [--jokes 2000000] [--queries 200]
+import argparse
+import math
+import os
+import random
+import statistics
+import time
+from bench_util import SETUP_WORDS, cached_file, generate_joke_file, load_exercise, print_table
+
+
+# Every matching joke scored from the whole of each posting list, to check and compare the pruned search
+def exhaustive_search(jokes_module, search_index, query, k):
+    scores = {}
+    for term in set(jokes_module.tokenize(query)):
+        postings = search_index.postings(term)
+        if len(postings):
+            weight = math.log(1 + (search_index.joke_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for joke_id in postings:
+                scores[joke_id] = scores.get(joke_id, 0.0) + weight
+    return sorted(scores.items(), key=lambda match: (-round(match[1], 9), match[0]))[:k]
+
+
+# Queries of each kind: rare topics, common words and mixes of the two
+def make_queries(rng, topics, count, stopwords):
+    common = [word for word in SETUP_WORDS if word not in stopwords]
+    kinds = {
+        'rare': lambda: rng.choice(topics),
+        'common': lambda: rng.choice(common),
+        'rare + rare': lambda: f"{rng.choice(topics)} {rng.choice(topics)}",
+        'common + rare': lambda: f"{rng.choice(common)} {rng.choice(topics)}",
+        'common x3': lambda: " ".join(rng.sample(common, 3)),
+    }
+    return {kind: [make() for _ in range(count)] for kind, make in kinds.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Joke search index build time, size and query latency.")
+    parser.add_argument('--jokes', type=int, default=2 * 10 ** 6)
+    parser.add_argument('--queries', type=int, default=200, help="queries timed per kind")
+    parser.add_argument('--k', type=int, default=10, help="matches asked for per query")
+    parser.add_argument('--data-dir', default=os.path.join(os.path.dirname(__file__), 'data'))
+    args = parser.parse_args()
+
+    jokes_module = load_exercise(2)
+    filename = cached_file(args.data_dir, f"jokes-{args.jokes}.txt", generate_joke_file, args.jokes)
+    corpus = jokes_module.open_joke_corpus(filename)
+    started = time.perf_counter()
+    jokes_module.build_search_index(corpus, filename, filename + '.fts')
+    built = time.perf_counter() - started
+    search_index = jokes_module.open_search_index(filename, corpus)
+    print_table(("jokes", "corpus (MiB)", "terms", "index build (s)", "index (MiB)"),
+                [(args.jokes, os.path.getsize(filename) / 2 ** 20, search_index.term_count, built,
+                  os.path.getsize(filename + '.fts') / 2 ** 20)])
+    print()
+
+    results = []
+    topics = [f"topic{i}" for i in range(max(args.jokes // 100, 10))]  # As generate_joke_file names them
+    for kind, queries in make_queries(random.Random(0), topics, args.queries, jokes_module.STOPWORDS).items():
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            matches = search_index.search(query, args.k)
+            timings.append((time.perf_counter() - started) * 1000)
+        # The exhaustive search is slow on common words, so only a few queries of each kind are checked
+        exhaustive = []
+        for query in queries[:5]:
+            started = time.perf_counter()
+            expected = exhaustive_search(jokes_module, search_index, query, args.k)
+            exhaustive.append((time.perf_counter() - started) * 1000)
+            matches = search_index.search(query, args.k)
+            assert [joke_id for score, joke_id in matches] == [joke_id for joke_id, score in expected], query
+        timings.sort()
+        results.append((kind, statistics.median(timings), timings[int(len(timings) * 0.99)],
+                        statistics.median(exhaustive)))
+    print_table(("query", "median (ms)", "p99 (ms)", "exhaustive median (ms)"), results)
+
+
+if __name__ == "__main__":
+    main()
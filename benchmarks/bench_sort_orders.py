@@ -0,0 +1,84 @@
+# Latency of changing a student and redrawing a sorted page: maintained sort orders against sort-then-redisplay
+#   python benchmarks/bench_sort_orders.py [--rows 100000 1000000] [--changes 200]
+import argparse
+import random
+import statistics
+import time
+from bench_util import load_exercise, print_table
+
+PAGE = 20  # Records on screen, as in the text box
+CRITERIA = {('name',): lambda student: student.name, ('marks',): lambda student: student.total_marks,
+            ('grade', 'name'): lambda student: (student.grade, student.name)}
+
+
+# Random changes to apply: update marks, delete or add a student
+def changes(rng, rows, count):
+    next_number = 1000 + rows
+    numbers = list(range(1000, 1000 + rows))
+    for _ in range(count):
+        kind = rng.choice(('update', 'update', 'delete', 'add'))
+        if kind == 'add':
+            numbers.append(next_number)
+            next_number += 1
+            yield kind, numbers[-1]
+        elif kind == 'delete':
+            yield kind, numbers.pop(rng.randrange(len(numbers)))
+        else:
+            yield kind, rng.choice(numbers)
+
+
+# Median milliseconds per change for one way of keeping the page sorted
+def run(students_module, rows, count, criteria, maintained):
+    rng = random.Random(0)
+    marks = lambda: ([rng.randint(0, 20) for _ in range(3)], rng.randint(0, 100))
+    if maintained:
+        table = students_module.StudentTable()
+        for number in range(1000, 1000 + rows):
+            table.add(number, f"Student {rng.randrange(rows)}", *marks())
+        table.order(criteria)  # Built once, the first time the user sorts
+    else:
+        students = {number: students_module.Student(number, f"Student {rng.randrange(rows)}", *marks())
+                    for number in range(1000, 1000 + rows)}
+    timings = []
+    for kind, number in changes(random.Random(1), rows, count):
+        started = time.perf_counter()
+        if maintained:
+            if kind == 'add':
+                table.add(number, "New Student", *marks())
+            elif kind == 'delete':
+                table.delete(number)
+            else:
+                table.update(number, table.get(number).name, *marks())
+            page = [table.at(i, criteria).display() for i in range(PAGE)]
+        else:
+            if kind == 'add':
+                students[number] = students_module.Student(number, "New Student", *marks())
+            elif kind == 'delete':
+                del students[number]
+            else:
+                students[number] = students_module.Student(number, students[number].name, *marks())
+            ordered = sorted(students.values(), key=CRITERIA[criteria])  # What sort_records used to do
+            page = [student.display() for student in ordered[:PAGE]]
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Change-plus-redraw latency with maintained sort orders.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10 ** 5, 10 ** 6])
+    parser.add_argument('--changes', type=int, default=200, help="changes timed with maintained orders")
+    parser.add_argument('--resort-changes', type=int, default=5, help="changes timed with full re-sorts")
+    args = parser.parse_args()
+
+    students_module = load_exercise(3)
+    results = []
+    for rows in args.rows:
+        for criteria in CRITERIA:
+            maintained = run(students_module, rows, args.changes, criteria, True)
+            resorted = run(students_module, rows, args.resort_changes, criteria, False)
+            results.append((rows, ",".join(criteria), maintained, resorted, f"{resorted / maintained:.0f}x"))
+    print_table(("rows", "criteria", "maintained (ms)", "re-sort (ms)", "speedup"), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Import time of each app, whether importing it pulls in tkinter, and time to first paint through the launcher
+#   python benchmarks/bench_startup.py [--repeat 5]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from bench_util import ROOT, print_table
+
+# Child process: import an app's script the way the launcher does and report how long it took
+IMPORT_APP = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import launcher
+launcher.load_app_module({filename!r})
+print(json.dumps({{'seconds': time.perf_counter() - started, 'tkinter': 'tkinter' in sys.modules}}))
+"""
+
+# Child process: launch an app whose start() closes the window again, then report the startup metrics
+FIRST_PAINT = """
+import json, sys
+sys.path.insert(0, {root!r})
+import launcher
+from instrumentation import metrics
+app_class = getattr(launcher.load_app_module({filename!r}), {class_name!r})
+
+class Probe(app_class):
+    def start(self, *args, **kwargs):
+        self.root.after(0, self.root.destroy)
+
+launcher.launch(Probe, started=launcher.LAUNCH_STARTED)
+print(json.dumps({{name: summary['sum'] for name, summary in metrics.snapshot()['histograms'].items()
+                  if name.startswith('startup_')}}))
+"""
+
+
+# Function to run Python code in a fresh interpreter and give back its wall time and the JSON it printed
+def run_child(code, env=None):
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True, env=env,
+                            cwd=ROOT).stdout
+    return time.perf_counter() - started, json.loads(output) if output.strip() else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="App import time and time to first paint.")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per measurement, the median is kept")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from launcher import APPS
+
+    interpreter = statistics.median(run_child("pass")[0] for _ in range(args.repeat))
+    print(f"bare interpreter start-up: {interpreter * 1000:.1f} ms")
+    results = []
+    for name, (filename, class_name) in APPS.items():
+        runs = [run_child(IMPORT_APP.format(root=ROOT, filename=filename)) for _ in range(args.repeat)]
+        results.append((name, statistics.median(run['seconds'] for wall, run in runs) * 1000,
+                        statistics.median(wall for wall, run in runs) * 1000,
+                        "yes" if any(run['tkinter'] for wall, run in runs) else "no"))
+    print_table(("app", "import (ms)", "process (ms)", "imports tkinter"), results)
+    print()
+
+    if sys.platform not in ('win32', 'darwin') and not os.environ.get('DISPLAY'):
+        print("no DISPLAY, skipping time to first paint (try xvfb-run)")
+        return
+    env = dict(os.environ, APP_METRICS='1')
+    results = []
+    for name, (filename, class_name) in APPS.items():
+        runs = [run_child(FIRST_PAINT.format(root=ROOT, filename=filename, class_name=class_name), env)
+                for _ in range(args.repeat)]
+        results.append((name, *(statistics.median(run[metric] for wall, run in runs) * 1000
+                                for metric in ('startup_app_import_seconds', 'startup_first_paint_seconds'))))
+    print_table(("app", "app import (ms)", "first paint (ms)"), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Writes/sec of StudentStore at each durability level, and recovery time after many logged edits
+#   python benchmarks/bench_store.py [--students 100000] [--edits 1000000] [--dir /tmp]
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from bench_util import generate_marks_file, load_exercise, print_table
+
+# Edits timed per durability level, fsync on every edit is slow enough that fewer will do
+WRITES = {'always': 2000, 'batch': 100000, 'none': 100000}
+
+
+# Apply random edits to a store: mostly mark updates, with some deletes and re-adds
+def edit(store, count, students, seed=0):
+    rng = random.Random(seed)
+    numbers = list(range(1000, 1000 + students))
+    deleted = []
+    for _ in range(count):
+        marks = ([rng.randint(0, 20) for _ in range(3)], rng.randint(0, 100))
+        roll = rng.random()
+        if roll < 0.05 and len(numbers) > 1:
+            number = numbers.pop(rng.randrange(len(numbers)))
+            store.delete(number)
+            deleted.append(number)
+        elif roll < 0.1 and deleted:
+            number = deleted.pop()
+            store.add(number, "Re Added", *marks)
+            numbers.append(number)
+        else:
+            number = rng.choice(numbers)
+            store.update(number, store.table.get(number).name, *marks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StudentStore write throughput and recovery time.")
+    parser.add_argument('--students', type=int, default=10 ** 5, help="students in the snapshot")
+    parser.add_argument('--edits', type=int, default=10 ** 6, help="logged edits to recover from")
+    parser.add_argument('--dir', help="where to put the store files (default: a temporary directory)")
+    args = parser.parse_args()
+
+    students_module = load_exercise(3)
+    work_dir = tempfile.mkdtemp(dir=args.dir)
+    try:
+        snapshot = os.path.join(work_dir, 'snapshot.txt')
+        generate_marks_file(snapshot, args.students)
+        filename = os.path.join(work_dir, 'studentMarks.txt')
+
+        writes = []
+        for durability, count in WRITES.items():
+            shutil.copy(snapshot, filename)
+            store = students_module.StudentStore(filename, durability=durability, compact_after=count + 1)
+            started = time.perf_counter()
+            edit(store, count, args.students)
+            store.close()
+            elapsed = time.perf_counter() - started
+            writes.append((durability, count, elapsed, round(count / elapsed)))
+            os.remove(store.log_filename)
+        print_table(("durability", "edits", "seconds", "edits/sec"), writes)
+        print()
+
+        # Log every edit without compacting, then time opening the store again
+        shutil.copy(snapshot, filename)
+        store = students_module.StudentStore(filename, durability='none', compact_after=args.edits + 1)
+        edit(store, args.edits, args.students, seed=1)
+        store.close()
+        log_size = os.path.getsize(store.log_filename)
+        started = time.perf_counter()
+        recovered = students_module.StudentStore(filename)
+        elapsed = time.perf_counter() - started
+        assert len(recovered.table) == len(store.table) and not recovered.bad_rows
+        recovered.close()
+        print_table(("snapshot students", "logged edits", "log (MiB)", "recovery (s)", "edits/sec replayed"),
+                    [(args.students, recovered.logged, log_size / 2 ** 20, elapsed, round(args.edits / elapsed))])
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import importlib.util
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+# The repository root, which holds the exercise scripts
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)  # For background_tasks, instrumentation and launcher
+
+# The exercise scripts by number, their file names are not valid module names
+EXERCISES = {
+    1: 'Exercise 1 - Math Quiz.py',
+    2: 'Exercise 2 - Alexa, tell me a joke.py',
+    3: 'Exercise 3 - Student Repository.py',
+}
+
+FIRST_NAMES = ("John", "Sam", "Lee", "Matt", "Anna", "Priya", "Chen", "Fatima", "Olu", "Maria", "José", "Zoë")
+LAST_NAMES = ("Curry", "Sturtivant", "Scott", "Thompson", "Smith", "Patel", "Wang", "Khan", "Adeyemi", "García")
+
+
+# Function to import one of the exercise scripts
+def load_exercise(number):
+    spec = importlib.util.spec_from_file_location(f"exercise{number}", os.path.join(ROOT, EXERCISES[number]))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Function to write a marks file in the studentMarks.txt format with the given number of random students
+def generate_marks_file(filename, rows, seed=0):
+    rng = random.Random(seed)
+    with open(filename, 'w', encoding='utf-8') as file:
+        file.write(f"{rows}\n")
+        for student_number in range(1000, 1000 + rows):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            coursework = ",".join(str(rng.randint(0, 20)) for _ in range(3))
+            file.write(f"{student_number},{name},{coursework},{rng.randint(0, 100)}\n")
+
+
+SETUP_WORDS = ("why", "did", "the", "chicken", "doctor", "cat", "dog", "cross", "road", "walk", "into", "bar",
+               "knock", "who", "there", "what", "call", "fish", "computer", "teacher", "pizza", "cow", "skeleton")
+
+
+# Function to write a joke corpus in the randomJokes.txt format with the given number of random jokes;
+# besides common words every joke mentions a couple of rarer topics, so searches have something to find
+def generate_joke_file(filename, jokes, seed=0):
+    rng = random.Random(seed)
+    topics = [f"topic{i}" for i in range(max(jokes // 100, 10))]
+    with open(filename, 'w', encoding='utf-8') as file:
+        for _ in range(jokes):
+            setup = " ".join(rng.choices(SETUP_WORDS, k=6) + [rng.choice(topics)])
+            file.write(f"{setup.capitalize()}?\nBecause of the {rng.choice(topics)} {rng.choice(SETUP_WORDS)}.\n")
+
+
+# Function to reuse a generated file between runs, only writing it if it is missing
+def cached_file(directory, name, generate, *args):
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.join(directory, name)
+    if not os.path.exists(filename):
+        started = time.perf_counter()
+        generate(filename + '.tmp', *args)
+        os.replace(filename + '.tmp', filename)
+        print(f"  (generated {name} in {time.perf_counter() - started:.1f} s)", file=sys.stderr)
+    return filename
+
+
+# Peak resident set size of this process in MiB
+def peak_rss_mb():
+    import resource  # Not available on Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024  # Bytes on macOS, KiB elsewhere
+
+
+# Function to run function(*args) in a fresh process, so its peak RSS is not mixed up with earlier runs
+def run_isolated(function, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+        return pool.submit(function, *args).result()
+
+
+# Function to print rows of values as an aligned table
+def print_table(headers, rows):
+    rows = [[f"{value:,.3f}" if isinstance(value, float) else f"{value:,}" if isinstance(value, int) else str(value)
+             for value in row] for row in rows]
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    for row in [headers, *rows]:
+        print("  ".join(str(cell).rjust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,248 @@
+import atexit
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from functools import wraps
+
+# Upper bounds of the timing histogram buckets in seconds, from 1 µs to about 18 minutes in steps of √2
+TIMING_BUCKETS = tuple(1e-6 * 2 ** (i / 2) for i in range(61))
+
+
+# Counts of observations per bucket, with their sum for the mean
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds=TIMING_BUCKETS):
+        self.bounds = bounds  # Upper bound of each bucket, ascending
+        self.counts = [0] * (len(bounds) + 1)  # Observations per bucket, plus one for anything larger
+        self.total = 0.0  # Sum of the observations
+        self.count = 0  # Number of observations
+
+    # Count one observation
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    # Value below which the given percentage of observations fall, to the resolution of the buckets
+    def percentile(self, percent):
+        wanted = self.count * percent / 100
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= wanted:
+                return self.bounds[min(bucket, len(self.bounds) - 1)]
+        return 0.0
+
+    # Figures for a dashboard
+    def summary(self):
+        return {'count': self.count, 'sum': self.total, 'mean': self.total / self.count if self.count else 0.0,
+                'p50': self.percentile(50), 'p90': self.percentile(90), 'p99': self.percentile(99)}
+
+
+# Context manager that times its block into a histogram
+class Timer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+
+
+# Context manager handed out while metrics are disabled, it does nothing
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+# Counters and timing histograms for the hot paths of the apps, plus opt-in profiling.
+# While disabled every call returns straight away, so instrumented code runs at full speed.
+class Metrics:
+    PROFILE_LINES = 30  # Functions listed in a profile report
+    MEMORY_LINES = 15  # Allocation sites listed in a profile report
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()  # Workers and the Tk thread update the same metrics
+        self.counters = {}  # Name -> running count
+        self.histograms = {}  # Name -> Histogram
+        self.profiler = None  # cProfile.Profile while profiling
+        self.profiler_thread = None  # The thread start_profiling was called on, the only one its profiler sees
+        self.thread_profilers = []  # Profiles of work run through profile_call on other threads
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    # Forget everything recorded so far
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    # Add to a counter
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Record a value, usually a duration in seconds, in a histogram
+    def observe(self, name, value):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    # Context manager timing its block into the named histogram
+    def timer(self, name):
+        return Timer(self, name) if self.enabled else NULL_TIMER
+
+    # Decorator timing every call of a function into the named histogram, and counting the calls that raise
+    def timed(self, name):
+        def decorate(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                except Exception:
+                    self.count(name + '_errors_total')
+                    raise
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    # Start cProfile, and tracemalloc too if memory is true
+    def start_profiling(self, memory=True):
+        if self.profiler is not None:
+            raise RuntimeError("already profiling")
+        if memory:
+            tracemalloc.start()
+        self.thread_profilers = []
+        self.profiler_thread = threading.current_thread()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    # Call function(*args), under a profiler of its own if profiling is on and this is not the thread that
+    # started it. cProfile only sees the thread that enables it, so worker threads run their work through here.
+    def profile_call(self, function, *args):
+        if self.profiler is None or threading.current_thread() is self.profiler_thread:
+            return function(*args)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(function, *args)
+        finally:
+            with self.lock:
+                self.thread_profilers.append(profiler)
+
+    # Stop profiling and return a text report of the slowest functions and the biggest allocation sites
+    def stop_profiling(self):
+        if self.profiler is None:
+            raise RuntimeError("not profiling")
+        self.profiler.disable()
+        report = io.StringIO()
+        if tracemalloc.is_tracing():
+            # Taken first so that building the report does not show up in it
+            current, peak = tracemalloc.get_traced_memory()
+            memory = tracemalloc.take_snapshot().statistics('lineno')[:self.MEMORY_LINES]
+            tracemalloc.stop()
+            report.write(f"Memory: {current / 1024:.1f} KiB allocated, {peak / 1024:.1f} KiB at peak\n")
+            for stat in memory:
+                report.write(f"{stat}\n")
+            report.write("\n")
+        stats = pstats.Stats(self.profiler, stream=report)
+        with self.lock:
+            for profiler in self.thread_profilers:
+                stats.add(profiler)  # Work from the worker threads, merged into one report
+            self.thread_profilers = []
+        stats.sort_stats('cumulative').print_stats(self.PROFILE_LINES)
+        self.profiler = None
+        self.profiler_thread = None
+        return report.getvalue()
+
+    # Everything recorded so far as plain data
+    def snapshot(self):
+        with self.lock:
+            return {'counters': dict(self.counters),
+                    'histograms': {name: histogram.summary() for name, histogram in self.histograms.items()}}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    # Everything recorded so far in the Prometheus text exposition format
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                lines += [f"# TYPE {name} counter", f"{name} {value}"]
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{le="{bound:.6g}"}} {cumulative}')
+                lines += [f'{name}_bucket{{le="+Inf"}} {histogram.count}',
+                          f"{name}_sum {histogram.total}", f"{name}_count {histogram.count}"]
+        return "\n".join(lines) + "\n"
+
+    # Write a snapshot to a file, as JSON if its name ends in .json and as Prometheus text otherwise
+    def write_snapshot(self, filename):
+        text = self.to_json() if filename.endswith('.json') else self.to_prometheus()
+        with open(filename + '.tmp', 'w') as file:
+            file.write(text)
+        os.replace(filename + '.tmp', filename)  # Anything scraping the file never sees half a snapshot
+
+
+# The metrics shared by all three apps, configured from the environment:
+#   APP_METRICS=1           record metrics
+#   APP_METRICS_FILE=path   also write them to path when the process exits (implies APP_METRICS=1)
+#   APP_PROFILE=path        profile the whole run with cProfile and tracemalloc and write the report to path
+metrics = Metrics(enabled=os.environ.get('APP_METRICS') == '1' or bool(os.environ.get('APP_METRICS_FILE')))
+count = metrics.count
+observe = metrics.observe
+timer = metrics.timer
+timed = metrics.timed
+
+if os.environ.get('APP_METRICS_FILE'):
+    atexit.register(metrics.write_snapshot, os.environ['APP_METRICS_FILE'])
+
+
+# Function to write the profile report at exit
+def write_profile(filename):
+    with open(filename, 'w') as file:
+        file.write(metrics.stop_profiling())
+
+
+if os.environ.get('APP_PROFILE'):
+    metrics.start_profiling()
+    atexit.register(write_profile, os.environ['APP_PROFILE'])
@@ -0,0 +1,81 @@
+import importlib
+import importlib.util
+import os
+import sys
+import time
+from instrumentation import observe
+
+LAUNCH_STARTED = time.perf_counter()  # Taken as early as possible, for the time to first paint
+
+# Apps the launcher can start by name: script and app class
+APPS = {
+    'quiz': ('Exercise 1 - Math Quiz.py', 'MathQuizApp'),
+    'jokes': ('Exercise 2 - Alexa, tell me a joke.py', 'JokeApp'),
+    'students': ('Exercise 3 - Student Repository.py', 'StudentApp'),
+}
+
+
+# Stand-in for a module that is only imported the first time one of its attributes is used,
+# so code that never opens a window never imports tkinter
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            started = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            observe('startup_import_seconds', time.perf_counter() - started)
+        return getattr(self._module, attribute)
+
+
+# Function to refer to a module without importing it yet
+def lazy_import(name):
+    return LazyModule(name)
+
+
+# Function to open an app's window and call app.start() once the window is on screen, so the
+# window appears straight away and anything slow, such as reading data files, happens after it
+def launch(app_class, *args, started=None, **kwargs):
+    started = started if started is not None else time.perf_counter()
+    import tkinter as tk
+    root = tk.Tk()
+    app = app_class(root, *args, **kwargs)
+
+    # Called when the main window is mapped, children being mapped report here too
+    def shown(event):
+        if event.widget is not root:
+            return
+        root.unbind('<Map>', binding)
+        observe('startup_first_paint_seconds', time.perf_counter() - started)
+        root.after_idle(app.start)  # Idle callbacks run after the pending redraws
+
+    binding = root.bind('<Map>', shown, '+')
+    root.mainloop()
+    return app
+
+
+# Function to import one of the exercise scripts, whose file names are not valid module names
+def load_app_module(filename):
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(filename))[0], path)
+    module = importlib.util.module_from_spec(spec)
+    started = time.perf_counter()
+    spec.loader.exec_module(module)
+    observe('startup_app_import_seconds', time.perf_counter() - started)
+    return module
+
+
+# Command line entry point: python launcher.py quiz|jokes|students
+def main(argv):
+    if len(argv) != 1 or argv[0] not in APPS:
+        print(f"usage: launcher.py {{{'|'.join(APPS)}}}", file=sys.stderr)
+        return 2
+    filename, class_name = APPS[argv[0]]
+    launch(getattr(load_app_module(filename), class_name), started=LAUNCH_STARTED)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))